@@ -0,0 +1,95 @@
+"""initial schema
+
+Исходная схема, которую раньше создавал Base.metadata.create_all.
+Базу, созданную так до появления миграций, init_db.py отмечает этой
+ревизией (alembic stamp 0001), не выполняя ее.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+appointment_status = sa.Enum(
+    "SCHEDULED", "CONFIRMED", "COMPLETED", "CANCELLED", "NO_SHOW",
+    name="appointmentstatus"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("password_hash", sa.String()),
+        sa.Column("full_name", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_admin", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "clients",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("phone", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("telegram_id", sa.String(), nullable=True),
+        sa.Column("telegram_username", sa.String(), nullable=True),
+        sa.Column("notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_clients_id", "clients", ["id"])
+    op.create_index("ix_clients_phone", "clients", ["phone"], unique=True)
+    op.create_index("ix_clients_email", "clients", ["email"])
+    op.create_index("ix_clients_telegram_id", "clients", ["telegram_id"], unique=True)
+
+    op.create_table(
+        "services",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("duration_minutes", sa.Integer()),
+        sa.Column("price", sa.Integer()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_services_id", "services", ["id"])
+
+    op.create_table(
+        "appointments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("datetime", sa.DateTime(), nullable=False),
+        sa.Column("status", appointment_status),
+        sa.Column("notes", sa.Text()),
+        sa.Column("reminder_sent", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("client_id", sa.Integer(), sa.ForeignKey("clients.id")),
+        sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_appointments_id", "appointments", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("appointments")
+    op.drop_table("services")
+    op.drop_table("clients")
+    op.drop_table("users")
+    appointment_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,54 @@
+"""indexes for hot appointment and client queries
+
+Составные индексы под выборки из crud.py:
+- appointments (owner_id, datetime, id) — списки, записи на дату,
+  предстоящие записи и keyset-пагинация;
+- appointments (datetime) WHERE reminder_sent = false AND status активный —
+  частичный индекс для поиска напоминаний;
+- clients (owner_id, id) — список клиентов и keyset-пагинация.
+
+Индексы строятся CONCURRENTLY, чтобы не блокировать запись в большие таблицы.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REMINDER_DUE_WHERE = sa.text("reminder_sent = false AND status IN ('SCHEDULED', 'CONFIRMED')")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_appointments_owner_id_datetime_id", "appointments",
+            ["owner_id", "datetime", "id"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_appointments_reminder_due", "appointments", ["datetime"],
+            postgresql_where=REMINDER_DUE_WHERE,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "ix_clients_owner_id_id", "clients", ["owner_id", "id"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_clients_owner_id_id", "clients", postgresql_concurrently=True)
+        op.drop_index("ix_appointments_reminder_due", "appointments", postgresql_concurrently=True)
+        op.drop_index("ix_appointments_owner_id_datetime_id", "appointments", postgresql_concurrently=True)
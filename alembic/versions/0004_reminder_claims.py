@@ -0,0 +1,33 @@
+"""reminder claims
+
+Столбцы аренды напоминаний: процесс-рассыльщик захватывает пачку записей
+(reminder_claimed_at, reminder_claimed_by), поэтому несколько воркеров
+не отправляют одно напоминание дважды, а захват упавшего воркера истекает.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Столбцы без значения по умолчанию: ALTER TABLE не переписывает таблицу
+    op.add_column("appointments", sa.Column("reminder_claimed_at", sa.DateTime(), nullable=True))
+    op.add_column("appointments", sa.Column("reminder_claimed_by", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("appointments", "reminder_claimed_by")
+    op.drop_column("appointments", "reminder_claimed_at")
@@ -0,0 +1,33 @@
+"""index for client upcoming appointments
+
+appointments (client_id, datetime) — предстоящие записи клиента в боте
+(«Мои записи») с постраничным выводом.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_appointments_client_id_datetime", "appointments", ["client_id", "datetime"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_appointments_client_id_datetime", "appointments", postgresql_concurrently=True)
@@ -0,0 +1,72 @@
+"""appointment overlap exclusion constraint
+
+appointments.end_datetime (datetime плюс длительность услуги) и
+ограничение-исключение: активные записи владельца не пересекаются
+по tsrange(datetime, end_datetime). Проверку выполняет GiST-индекс
+ограничения, в том числе для параллельных транзакций. Владелец
+сравнивается как int4range из одного значения — расширение btree_gist
+не нужно.
+
+Если в базе уже есть пересекающиеся активные записи, миграция
+останавливается со списком пар — их нужно перенести или отменить.
+В режиме --sql проверок нет: пересечения остановят сам ALTER TABLE.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "ex_appointments_owner_no_overlap"
+ACTIVE = "status IN ('SCHEDULED', 'CONFIRMED')"
+
+
+def upgrade() -> None:
+    op.add_column("appointments", sa.Column("end_datetime", sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE appointments SET end_datetime = datetime + make_interval(mins => COALESCE("
+        "(SELECT duration_minutes FROM services WHERE services.id = appointments.service_id), 0"
+        ")) WHERE end_datetime IS NULL"
+    )
+    op.alter_column("appointments", "end_datetime", nullable=False)
+
+    if not context.is_offline_mode():
+        _check_no_overlaps(op.get_bind())
+
+    op.execute(
+        f"ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT} EXCLUDE USING gist ("
+        "int4range(owner_id, owner_id, '[]') WITH &&, tsrange(datetime, end_datetime) WITH &&"
+        f") WHERE ({ACTIVE})"
+    )
+
+
+def _check_no_overlaps(bind):
+    """Пересекающиеся активные записи — ошибка со списком пар"""
+    overlaps = bind.execute(sa.text(
+        "SELECT a.id, b.id FROM appointments a JOIN appointments b"
+        " ON a.owner_id = b.owner_id AND a.id < b.id"
+        " AND tsrange(a.datetime, a.end_datetime) && tsrange(b.datetime, b.end_datetime)"
+        f" WHERE a.{ACTIVE} AND b.{ACTIVE} ORDER BY a.id, b.id LIMIT 20"
+    )).all()
+    if overlaps:
+        pairs = ", ".join(f"{first}/{second}" for first, second in overlaps)
+        raise RuntimeError(
+            f"Есть пересекающиеся активные записи (id пар: {pairs}). "
+            "Перенесите или отмените их и повторите миграцию."
+        )
+
+
+def downgrade() -> None:
+    op.drop_constraint(CONSTRAINT, "appointments")
+    op.drop_column("appointments", "end_datetime")
@@ -0,0 +1,44 @@
+"""index on normalized clients.phone
+
+Импорт клиентов ищет уже записанные телефоны в нормализованном виде
+(+<цифры>, российские номера — +7), в каком бы формате их ни ввели.
+Выражение совпадает с models.CLIENT_PHONE_KEY на момент миграции.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:07
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DIGITS = "regexp_replace(phone, '[^0-9]', '', 'g')"
+PHONE_KEY = (
+    f"'+' || CASE"
+    f" WHEN left(ltrim(phone), 1) = '+' THEN {DIGITS}"
+    f" WHEN {DIGITS} ~ '^8[0-9]{{10}}$' THEN '7' || substr({DIGITS}, 2)"
+    f" WHEN {DIGITS} ~ '^[0-9]{{10}}$' THEN '7' || {DIGITS}"
+    f" ELSE {DIGITS} END"
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_clients_phone_key", "clients", [sa.text(f"({PHONE_KEY})")],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_clients_phone_key", "clients", postgresql_concurrently=True)
@@ -1,107 +1,196 @@
-from typing import List
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import get_async_db
 from ..core.auth import get_current_active_user
-from ..crud import crud
+from ..core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from ..crud import async_crud
+from ..crud.crud import (
+    SERVICE_DURATION_DETAIL, AppointmentOverlapError, ClientNotFoundError, ServiceDurationError, ServiceNotFoundError
+)
 from ..schemas import schemas
+from ..services import availability
 
 router = APIRouter()
 
+OVERLAP_DETAIL = "Время пересекается с другой записью"
+
 
 @router.get("/", response_model=List[schemas.Appointment])
-def read_appointments(
+async def read_appointments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить список записей"""
-    appointments = crud.get_appointments(db, owner_id=current_user.id, skip=skip, limit=limit)
+    """Получить список записей.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor;
+    skip/limit оставлены для совместимости.
+    """
+    after = None
+    if cursor:
+        try:
+            after_datetime, after_id = decode_cursor(cursor)
+            after = (datetime.fromisoformat(after_datetime), int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    appointments = await async_crud.get_appointments(
+        db, owner_id=current_user.id, skip=skip, limit=limit, after=after
+    )
+    if limit and len(appointments) == limit:
+        last = appointments[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.datetime, last.id)
     return appointments
 
 
 @router.get("/by-date/{target_date}", response_model=List[schemas.Appointment])
-def read_appointments_by_date(
+async def read_appointments_by_date(
     target_date: date,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить записи на конкретную дату"""
-    appointments = crud.get_appointments_by_date(db, owner_id=current_user.id, target_date=target_date)
+    appointments = await async_crud.get_appointments_by_date(db, owner_id=current_user.id, target_date=target_date)
     return appointments
 
 
 @router.get("/upcoming", response_model=List[schemas.Appointment])
-def read_upcoming_appointments(
+async def read_upcoming_appointments(
     days_ahead: int = Query(default=7, description="Количество дней вперед"),
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить предстоящие записи"""
-    appointments = crud.get_upcoming_appointments(db, owner_id=current_user.id, days_ahead=days_ahead)
+    appointments = await async_crud.get_upcoming_appointments(db, owner_id=current_user.id, days_ahead=days_ahead)
     return appointments
 
 
+@router.get("/availability", response_model=List[schemas.AvailableSlot])
+async def read_availability(
+    service_id: int,
+    date_from: date,
+    date_to: Optional[date] = Query(default=None, description="По умолчанию — date_from"),
+    current_user: schemas.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Свободные слоты для услуги в диапазоне дат (включительно) с учетом часов работы и записей"""
+    date_to = date_to or date_from
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+    if (date_to - date_from).days >= settings.availability_max_days:
+        raise HTTPException(
+            status_code=400, detail=f"Диапазон не больше {settings.availability_max_days} дней"
+        )
+
+    catalog = await async_crud.get_service_catalog(db)
+    service = catalog.by_id.get(service_id)
+    if service is None or not service.is_active:
+        raise HTTPException(status_code=404, detail="Услуга не найдена")
+    if service.duration_minutes is None:
+        raise HTTPException(status_code=400, detail=SERVICE_DURATION_DETAIL)
+
+    duration = timedelta(minutes=service.duration_minutes)
+    slots = await availability.get_free_slots(
+        db, current_user.id, service.duration_minutes, date_from, date_to
+    )
+    return [schemas.AvailableSlot(start=start, end=start + duration) for start in slots]
+
+
 @router.post("/", response_model=schemas.Appointment)
-def create_appointment(
+async def create_appointment(
     appointment: schemas.AppointmentCreate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создать новую запись"""
     # Проверяем, что клиент принадлежит текущему пользователю
-    client = crud.get_client(db, client_id=appointment.client_id, owner_id=current_user.id)
+    client = await async_crud.get_client(db, client_id=appointment.client_id, owner_id=current_user.id)
     if not client:
         raise HTTPException(status_code=404, detail="Клиент не найден")
     
     # Проверяем, что услуга существует
-    service = crud.get_service(db, service_id=appointment.service_id)
+    service = await async_crud.get_service(db, service_id=appointment.service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Услуга не найдена")
     
-    return crud.create_appointment(db=db, appointment=appointment, owner_id=current_user.id)
+    try:
+        return await async_crud.create_appointment(db=db, appointment=appointment, owner_id=current_user.id)
+    except AppointmentOverlapError:
+        raise HTTPException(status_code=409, detail=OVERLAP_DETAIL)
+    except ClientNotFoundError:
+        raise HTTPException(status_code=404, detail="Клиент не найден")
+    except ServiceNotFoundError:
+        raise HTTPException(status_code=404, detail="Услуга не найдена")
+    except ServiceDurationError:
+        raise HTTPException(status_code=400, detail=SERVICE_DURATION_DETAIL)
+
+
+@router.post("/batch", response_model=List[schemas.BatchItemResult])
+async def batch_appointments(
+    batch: schemas.AppointmentBatch,
+    current_user: schemas.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Создать, изменить и удалить записи одним запросом.
+
+    Операции применяются в одной транзакции; результат — по каждой операции
+    в порядке запроса. Ошибка операции (404, 409 при пересечении) не
+    отменяет остальные.
+    """
+    if len(batch.operations) > settings.batch_max_operations:
+        raise HTTPException(status_code=400, detail=f"Не больше {settings.batch_max_operations} операций")
+    return await async_crud.batch_appointments(db, batch.operations, current_user.id)
 
 
 @router.get("/{appointment_id}", response_model=schemas.Appointment)
-def read_appointment(
+async def read_appointment(
     appointment_id: int,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить запись по ID"""
-    db_appointment = crud.get_appointment(db, appointment_id=appointment_id, owner_id=current_user.id)
+    db_appointment = await async_crud.get_appointment(db, appointment_id=appointment_id, owner_id=current_user.id)
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Запись не найдена")
     return db_appointment
 
 
 @router.put("/{appointment_id}", response_model=schemas.Appointment)
-def update_appointment(
+async def update_appointment(
     appointment_id: int,
     appointment: schemas.AppointmentUpdate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновить запись"""
-    db_appointment = crud.update_appointment(
-        db, appointment_id=appointment_id, appointment=appointment, owner_id=current_user.id
-    )
+    try:
+        db_appointment = await async_crud.update_appointment(
+            db, appointment_id=appointment_id, appointment=appointment, owner_id=current_user.id
+        )
+    except AppointmentOverlapError:
+        raise HTTPException(status_code=409, detail=OVERLAP_DETAIL)
+    except ServiceDurationError:
+        raise HTTPException(status_code=400, detail=SERVICE_DURATION_DETAIL)
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Запись не найдена")
     return db_appointment
 
 
 @router.delete("/{appointment_id}")
-def delete_appointment(
+async def delete_appointment(
     appointment_id: int,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Удалить запись"""
-    db_appointment = crud.delete_appointment(db, appointment_id=appointment_id, owner_id=current_user.id)
+    db_appointment = await async_crud.delete_appointment(db, appointment_id=appointment_id, owner_id=current_user.id)
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Запись не найдена")
     return {"message": "Запись удалена"}
\ No newline at end of file
@@ -1,60 +1,139 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from uuid import uuid4
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
-from ..core.auth import create_access_token
+from ..core.database import get_async_db
+from ..core.auth import create_access_token, create_refresh_token, decode_refresh_token
 from ..core.config import settings
-from ..crud import crud
+from ..core.passwords import PasswordHasherBusy
+from ..crud import async_crud
 from ..schemas import schemas
 
 router = APIRouter()
 
 
+def _hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Сервер перегружен, повторите попытку позже",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _access_token(user):
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    return create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+
+
+def _refresh_token_expires_at():
+    return datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+
+
+async def _issue_tokens(db: AsyncSession, user):
+    """Access-токен и refresh-токен нового семейства"""
+    jti, expires_at = uuid4().hex, _refresh_token_expires_at()
+    await async_crud.create_refresh_token(db, jti, user.id, uuid4().hex, expires_at)
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user.email, jti, expires_at),
+    }
+
+
 @router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Регистрация нового пользователя"""
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Пользователь с таким email уже существует"
         )
-    return crud.create_user(db=db, user=user)
+    try:
+        return await async_crud.create_user(db=db, user=user)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
 
 
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Авторизация пользователя"""
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await async_crud.authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await _issue_tokens(db, user)
 
 
 @router.post("/login-json", response_model=schemas.Token)
-def login_json(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_json(user_login: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Авторизация пользователя через JSON"""
-    user = crud.authenticate_user(db, user_login.email, user_login.password)
+    try:
+        user = await async_crud.authenticate_user(db, user_login.email, user_login.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
         )
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    return await _issue_tokens(db, user)
+
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_tokens(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    """Обновить токены по refresh-токену (без проверки пароля).
+
+    Refresh-токен одноразовый: в ответе приходит новый, старый отзывается.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Недействительный refresh-токен",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    try:
+        payload = decode_refresh_token(request.refresh_token)
+    except JWTError:
+        raise credentials_exception
+
+    new_jti, expires_at = uuid4().hex, _refresh_token_expires_at()
+    db_token = await async_crud.rotate_refresh_token(db, payload["jti"], new_jti, expires_at)
+    if db_token is None:
+        raise credentials_exception
+
+    user = await async_crud.get_user(db, db_token.user_id)
+    if user is None or not user.is_active:
+        await async_crud.revoke_refresh_token_family(db, db_token.family_id)
+        raise credentials_exception
+
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user.email, new_jti, expires_at),
+    }
+
+
+@router.post("/logout")
+async def logout(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    """Выход: отзыв refresh-токена и всех выпущенных из него"""
+    try:
+        payload = decode_refresh_token(request.refresh_token, verify_exp=False)
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Недействительный refresh-токен")
+
+    db_token = await async_crud.get_refresh_token(db, payload["jti"])
+    if db_token:
+        await async_crud.revoke_refresh_token_family(db, db_token.family_id)
+    return {"message": "Выход выполнен"}
@@ -1,77 +1,131 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import get_async_db
 from ..core.auth import get_current_active_user
-from ..crud import crud
+from ..core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from ..crud import async_crud
 from ..schemas import schemas
+from ..services.client_import import ClientImportError, import_clients_async, read_rows
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Client])
-def read_clients(
+async def read_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить список клиентов"""
-    clients = crud.get_clients(db, owner_id=current_user.id, skip=skip, limit=limit)
+    """Получить список клиентов.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor;
+    skip/limit оставлены для совместимости.
+    """
+    after_id = None
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor)
+            after_id = int(after_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    clients = await async_crud.get_clients(
+        db, owner_id=current_user.id, skip=skip, limit=limit, after_id=after_id
+    )
+    if limit and len(clients) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(clients[-1].id)
     return clients
 
 
 @router.post("/", response_model=schemas.Client)
-def create_client(
+async def create_client(
     client: schemas.ClientCreate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создать нового клиента"""
     # Проверяем, не существует ли клиент с таким телефоном
-    db_client = crud.get_client_by_phone(db, phone=client.phone, owner_id=current_user.id)
+    db_client = await async_crud.get_client_by_phone(db, phone=client.phone, owner_id=current_user.id)
     if db_client:
         raise HTTPException(status_code=400, detail="Клиент с таким телефоном уже существует")
     
-    return crud.create_client(db=db, client=client, owner_id=current_user.id)
+    return await async_crud.create_client(db=db, client=client, owner_id=current_user.id)
+
+
+@router.post("/import", response_model=schemas.ClientImportReport)
+async def import_clients(
+    file: UploadFile = File(..., description="CSV (UTF-8 или cp1251) или XLSX со столбцами full_name/ФИО и phone/Телефон"),
+    current_user: schemas.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Массовый импорт клиентов.
+
+    Строки с ошибками и телефоны, которые уже есть, пропускаются и
+    попадают в отчет; остальные строки импортируются.
+    """
+    try:
+        return await import_clients_async(db, read_rows(file.file, file.filename), current_user.id)
+    except ClientImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/batch", response_model=List[schemas.BatchItemResult])
+async def batch_clients(
+    batch: schemas.ClientBatch,
+    current_user: schemas.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Создать, изменить и удалить клиентов одним запросом.
+
+    Операции применяются в одной транзакции; результат — по каждой операции
+    в порядке запроса. Ошибка операции (404, 409) не отменяет остальные.
+    """
+    if len(batch.operations) > settings.batch_max_operations:
+        raise HTTPException(status_code=400, detail=f"Не больше {settings.batch_max_operations} операций")
+    return await async_crud.batch_clients(db, batch.operations, current_user.id)
 
 
 @router.get("/{client_id}", response_model=schemas.Client)
-def read_client(
+async def read_client(
     client_id: int,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить клиента по ID"""
-    db_client = crud.get_client(db, client_id=client_id, owner_id=current_user.id)
+    db_client = await async_crud.get_client(db, client_id=client_id, owner_id=current_user.id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Клиент не найден")
     return db_client
 
 
 @router.put("/{client_id}", response_model=schemas.Client)
-def update_client(
+async def update_client(
     client_id: int,
     client: schemas.ClientUpdate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновить данные клиента"""
-    db_client = crud.update_client(db, client_id=client_id, client=client, owner_id=current_user.id)
+    db_client = await async_crud.update_client(db, client_id=client_id, client=client, owner_id=current_user.id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Клиент не найден")
     return db_client
 
 
 @router.delete("/{client_id}")
-def delete_client(
+async def delete_client(
     client_id: int,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Удалить клиента"""
-    db_client = crud.delete_client(db, client_id=client_id, owner_id=current_user.id)
+    db_client = await async_crud.delete_client(db, client_id=client_id, owner_id=current_user.id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Клиент не найден")
     return {"message": "Клиент удален"}
\ No newline at end of file
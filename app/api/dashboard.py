@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..core.auth import get_current_active_user
-from ..crud import crud
+from ..crud import async_crud
 from ..schemas import schemas
 
 router = APIRouter()
 
 
 @router.get("/stats", response_model=schemas.DashboardStats)
-def get_dashboard_stats(
+async def get_dashboard_stats(
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить статистику для дашборда"""
-    return crud.get_dashboard_stats(db, owner_id=current_user.id)
\ No newline at end of file
+    return await async_crud.get_dashboard_stats(db, owner_id=current_user.id)
\ No newline at end of file
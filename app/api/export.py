@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Callable, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Enum, and_, select
+from starlette.background import BackgroundTask
+
+from ..core.auth import get_current_active_user
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models import models
+from ..schemas import schemas
+
+router = APIRouter()
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+CLIENT_COLUMNS = [
+    models.Client.id,
+    models.Client.full_name,
+    models.Client.phone,
+    models.Client.email,
+    models.Client.telegram_username,
+    models.Client.telegram_id,
+    models.Client.notes,
+    models.Client.created_at,
+]
+
+APPOINTMENT_COLUMNS = [
+    models.Appointment.id,
+    models.Appointment.datetime,
+    models.Appointment.end_datetime,
+    models.Appointment.status,
+    models.Appointment.notes,
+    models.Appointment.reminder_sent,
+    models.Appointment.client_id,
+    models.Client.full_name.label("client_full_name"),
+    models.Client.phone.label("client_phone"),
+    models.Appointment.service_id,
+    models.Service.name.label("service_name"),
+    models.Appointment.created_at,
+]
+
+# Одновременных выгрузок в процессе: каждая держит соединение пула API до конца
+_running_exports = 0
+
+
+class _ExportSlot:
+    """Место выгрузки в лимите export_max_concurrent; занимается при создании.
+
+    Освобождают его и поток строк (finally), и фоновая задача ответа —
+    поток мог так и не начаться, если клиент отключился раньше. Повторный
+    release() ничего не делает.
+    """
+
+    def __init__(self):
+        global _running_exports
+        _running_exports += 1
+        self.released = False
+
+    def release(self):
+        global _running_exports
+        if not self.released:
+            self.released = True
+            _running_exports -= 1
+
+    async def release_after_response(self):
+        # Корутина: BackgroundTask выполнит ее в цикле событий, а не в пуле потоков
+        self.release()
+
+
+def _converters(statement) -> List[Optional[Callable]]:
+    """Преобразование значений по типу столбца: Enum — в значение, даты — в ISO 8601"""
+    converters = []
+    for column in statement.selected_columns:
+        if isinstance(column.type, Enum):
+            converters.append(lambda value: value.value if value is not None else None)
+        elif isinstance(column.type, DateTime):
+            converters.append(lambda value: value.isoformat() if value is not None else None)
+        else:
+            converters.append(None)
+    return converters
+
+
+def _values(converters, rows):
+    for row in rows:
+        yield [convert(value) if convert else value for convert, value in zip(converters, row)]
+
+
+def _encode_csv(columns: List[str], rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _encode_ndjson(columns: List[str], rows, header: bool) -> str:
+    return "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+async def _stream_rows(
+    statement, columns: List[str], fmt: str, compress: bool, slot: _ExportSlot
+) -> AsyncIterator[bytes]:
+    """Строки запроса через серверный курсор пачками по export_yield_per.
+
+    Сессия своя: она живет, пока клиент читает ответ. В памяти одновременно
+    только одна пачка строк, поэтому память не зависит от размера выгрузки.
+    """
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    converters = _converters(statement)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 — формат gzip
+    header = True
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(statement.execution_options(yield_per=settings.export_yield_per))
+            async for partition in result.partitions():
+                chunk = encode(columns, _values(converters, partition), header).encode()
+                header = False
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+        if header:
+            # Пустая выгрузка: в CSV остается заголовок
+            chunk = encode(columns, [], header).encode()
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        slot.release()
+
+
+def _export_response(statement, columns: List[str], name: str, fmt: str, compress: bool) -> StreamingResponse:
+    if _running_exports >= settings.export_max_concurrent:
+        raise HTTPException(status_code=503, detail="Слишком много выгрузок, повторите позже")
+    # Место занимается при проверке, а не в начале потока: иначе параллельные
+    # запросы проходят проверку раньше, чем хоть один поток начнется
+    slot = _ExportSlot()
+    filename = f"{name}.{fmt}" + (".gz" if compress else "")
+    return StreamingResponse(
+        _stream_rows(statement, columns, fmt, compress, slot),
+        media_type="application/gzip" if compress else FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(slot.release_after_response),
+    )
+
+
+@router.get("/clients")
+async def export_clients(
+    format: str = Query(default="csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """Выгрузить всех клиентов (CSV или NDJSON, по возрастанию id)"""
+    statement = select(*CLIENT_COLUMNS).where(
+        models.Client.owner_id == current_user.id
+    ).order_by(models.Client.id)
+    return _export_response(statement, [column.key for column in CLIENT_COLUMNS], "clients", format, gzip)
+
+
+@router.get("/appointments")
+async def export_appointments(
+    format: str = Query(default="csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = Query(default=None, description="Включительно"),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """Выгрузить записи с клиентом и услугой (CSV или NDJSON, по дате)"""
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+
+    conditions = [models.Appointment.owner_id == current_user.id]
+    if date_from:
+        conditions.append(models.Appointment.datetime >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(models.Appointment.datetime < datetime.combine(date_to + timedelta(days=1), time.min))
+    statement = (
+        select(*APPOINTMENT_COLUMNS)
+        .outerjoin(models.Client, models.Client.id == models.Appointment.client_id)
+        .outerjoin(models.Service, models.Service.id == models.Appointment.service_id)
+        .where(and_(*conditions))
+        .order_by(models.Appointment.datetime, models.Appointment.id)
+    )
+    return _export_response(statement, [column.key for column in APPOINTMENT_COLUMNS], "appointments", format, gzip)
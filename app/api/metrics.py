@@ -0,0 +1,33 @@
+from typing import List
+from fastapi import APIRouter, Depends
+
+from ..core.auth import get_current_admin_user
+from ..core.cache import cache_stats
+from ..core.database import sync_pool_metrics, async_pool_metrics, bot_pool_metrics
+from ..schemas import schemas
+from ..services.telegram_bot import telegram_bot
+
+# Внутреннее состояние процесса — только для администраторов
+router = APIRouter(dependencies=[Depends(get_current_admin_user)])
+
+
+@router.get("/db-pool", response_model=List[schemas.DbPoolStats])
+async def get_db_pool_metrics():
+    """Состояние пулов соединений с базой данных.
+
+    Сам эндпоинт к базе не обращается; администратор из кеша авторизации
+    получает ответ и тогда, когда пул исчерпан.
+    """
+    return [sync_pool_metrics.snapshot(), async_pool_metrics.snapshot(), bot_pool_metrics.snapshot()]
+
+
+@router.get("/caches", response_model=List[schemas.CacheStats])
+async def get_cache_metrics():
+    """Размер и попадания in-memory кешей текущего процесса"""
+    return cache_stats()
+
+
+@router.get("/telegram", response_model=schemas.TelegramSendStats)
+async def get_telegram_metrics():
+    """Очередь исходящих сообщений Telegram: отправлено, повторы, ошибки"""
+    return {"running": telegram_bot.sender.running, **telegram_bot.sender.stats()}
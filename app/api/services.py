@@ -1,60 +1,77 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import get_async_db
 from ..core.auth import get_current_active_user
-from ..crud import crud
+from ..crud import async_crud
 from ..schemas import schemas
 
 router = APIRouter()
 
 
+def _catalog_response(content: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """JSON из каталога с ETag; 304 без тела, если у клиента та же версия"""
+    etag = f'"{etag}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.service_catalog_max_age}"}
+    if if_none_match and (
+        if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
 @router.get("/", response_model=List[schemas.Service])
-def read_services(
+async def read_services(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить список услуг"""
-    services = crud.get_services(db, skip=skip, limit=limit)
-    return services
+    """Получить список услуг (из каталога в памяти)"""
+    catalog = await async_crud.get_service_catalog(db)
+    return _catalog_response(catalog.list_json(skip, limit), f"{catalog.etag}-{skip}-{limit}", if_none_match)
 
 
 @router.post("/", response_model=schemas.Service)
-def create_service(
+async def create_service(
     service: schemas.ServiceCreate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создать новую услугу (только для администраторов)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     
-    return crud.create_service(db=db, service=service)
+    return await async_crud.create_service(db=db, service=service)
 
 
 @router.get("/{service_id}", response_model=schemas.Service)
-def read_service(service_id: int, db: Session = Depends(get_db)):
-    """Получить услугу по ID"""
-    db_service = crud.get_service(db, service_id=service_id)
-    if db_service is None:
+async def read_service(
+    service_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Получить услугу по ID (из каталога в памяти)"""
+    catalog = await async_crud.get_service_catalog(db)
+    if service_id not in catalog.by_id:
         raise HTTPException(status_code=404, detail="Услуга не найдена")
-    return db_service
+    return _catalog_response(catalog.json_by_id[service_id], catalog.etags[service_id], if_none_match)
 
 
 @router.put("/{service_id}", response_model=schemas.Service)
-def update_service(
+async def update_service(
     service_id: int,
     service: schemas.ServiceUpdate,
     current_user: schemas.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновить услугу (только для администраторов)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     
-    db_service = crud.update_service(db, service_id=service_id, service=service)
+    db_service = await async_crud.update_service(db, service_id=service_id, service=service)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Услуга не найдена")
     return db_service
\ No newline at end of file
@@ -0,0 +1,51 @@
+import hmac
+import logging
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, status
+
+from ..core.config import settings
+from ..services.telegram_bot import telegram_bot
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None)
+):
+    """Прием обновлений Telegram (режим webhook).
+
+    Telegram передает секрет из setWebhook в заголовке
+    X-Telegram-Bot-Api-Secret-Token; без совпадения запрос отклоняется.
+    Обновления обрабатываются параллельно, не более
+    TELEGRAM_WEBHOOK_CONCURRENCY одновременно в процессе.
+    """
+    secret = settings.telegram_webhook_secret
+    if not secret or not hmac.compare_digest(x_telegram_bot_api_secret_token or "", secret):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Неверный секрет webhook"
+        )
+    if not telegram_bot.webhook_running:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Telegram бот не запущен в режиме webhook"
+        )
+
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный JSON"
+        )
+
+    # Ошибку обработчика Telegram все равно получает 200, иначе будет слать обновление повторно
+    try:
+        await telegram_bot.process_update(data)
+    except Exception as e:
+        logger.error(f"Ошибка обработки обновления Telegram: {e}")
+    return {"ok": True}
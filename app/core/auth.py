@@ -3,15 +3,33 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import TTLCache
 from .config import settings
-from .database import get_db
-from ..crud import crud
+from .database import get_async_db
+from ..crud import async_crud
+from ..models import models
 from ..schemas import schemas
 
 security = HTTPBearer()
 
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# Авторизованные пользователи по subject токена (email)
+user_cache = TTLCache("users", maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Сбросить кеш при любом изменении пользователя (деактивация, права, смена email)"""
+    for email in [target.email, *get_history(target, "email").deleted]:
+        user_cache.delete(email)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -19,14 +37,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": ACCESS_TOKEN_TYPE})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
+def create_refresh_token(email: str, jti: str, expires_at: datetime):
+    """Refresh-токен; его состояние (отзыв, ротация) хранится в таблице refresh_tokens"""
+    to_encode = {"sub": email, "jti": jti, "exp": expires_at, "type": REFRESH_TOKEN_TYPE}
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+
+def decode_refresh_token(token: str, verify_exp: bool = True) -> dict:
+    """Проверить подпись и тип refresh-токена; при ошибке выбрасывает JWTError"""
+    payload = jwt.decode(
+        token, settings.secret_key, algorithms=[settings.algorithm],
+        options={"verify_exp": verify_exp}
+    )
+    if payload.get("type") != REFRESH_TOKEN_TYPE or not payload.get("jti"):
+        raise JWTError("Not a refresh token")
+    return payload
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,19 +72,28 @@ async def get_current_user(
         token = credentials.credentials
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("type") == REFRESH_TOKEN_TYPE:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = user_cache.get(token_data.email)
     if user is None:
-        raise credentials_exception
+        db_user = await async_crud.get_user_by_email(db, email=token_data.email)
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.User.model_validate(db_user)
+        user_cache.set(token_data.email, user)
     return user
 
 
 async def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_user(current_user: schemas.User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    return current_user
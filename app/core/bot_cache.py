@@ -0,0 +1,20 @@
+from .cache import TTLCache
+from .config import settings
+
+# Готовые страницы «Мои записи» в боте: client_id -> {страница: (текст, клавиатура)}.
+# Сбрасывается в crud при записи, изменении и отмене; ttl — потому что
+# прошедшие записи выпадают из списка со временем.
+client_appointments_cache = TTLCache(
+    "bot_client_appointments",
+    maxsize=settings.bot_cache_size,
+    ttl=settings.bot_appointments_cache_ttl_seconds
+)
+
+# Клиенты по Telegram: ("id", telegram_id) и ("username", telegram_username)
+# -> schemas.ClientIdentity. Сбрасывается в crud при изменении и удалении клиента;
+# другие процессы узнают об изменении по ttl или когда клиента из кеша не оказалось в базе.
+client_identity_cache = TTLCache(
+    "bot_client_identity",
+    maxsize=settings.bot_cache_size,
+    ttl=settings.bot_identity_cache_ttl_seconds
+)
@@ -0,0 +1,114 @@
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+from .cache import TTLCache
+from .config import settings
+from ..schemas import schemas
+
+
+def local_today() -> date:
+    """Текущая дата в часовом поясе бизнеса (settings.timezone)"""
+    return datetime.now(ZoneInfo(settings.timezone)).date()
+
+
+class DashboardStatsCache(ABC):
+    """Кеш статистики дашборда по владельцу.
+
+    Записи привязаны к дню (счетчики «сегодня» и «предстоящие» сбрасываются
+    в полночь по settings.timezone). Поколение владельца меняется при каждой
+    записи в crud, поэтому результат, посчитанный до изменения, не попадет
+    в кеш после него.
+    """
+
+    @abstractmethod
+    def get(self, owner_id: int, day: date) -> Optional[schemas.DashboardStats]:
+        ...
+
+    @abstractmethod
+    def generation(self, owner_id: int) -> int:
+        ...
+
+    @abstractmethod
+    def set(self, owner_id: int, day: date, stats: schemas.DashboardStats, generation: int):
+        """Сохранить, только если с момента generation() данные не менялись"""
+
+    @abstractmethod
+    def invalidate(self, owner_id: int):
+        ...
+
+    @abstractmethod
+    def adjust(self, owner_id: int, **deltas: int):
+        """Изменить счетчики закешированной статистики на deltas"""
+
+
+class NullDashboardStatsCache(DashboardStatsCache):
+    """Без кеширования: статистика считается на каждый запрос"""
+
+    def get(self, owner_id: int, day: date) -> Optional[schemas.DashboardStats]:
+        return None
+
+    def generation(self, owner_id: int) -> int:
+        return 0
+
+    def set(self, owner_id: int, day: date, stats: schemas.DashboardStats, generation: int):
+        pass
+
+    def invalidate(self, owner_id: int):
+        pass
+
+    def adjust(self, owner_id: int, **deltas: int):
+        pass
+
+
+class InMemoryDashboardStatsCache(DashboardStatsCache):
+    """Кеш в памяти процесса; изменения из других воркеров видны через ttl"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache("dashboard_stats", maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, owner_id: int, day: date) -> Optional[schemas.DashboardStats]:
+        entry = self._entries.get(owner_id)
+        if entry is None or entry[0] != day:
+            return None
+        return entry[1]
+
+    def generation(self, owner_id: int) -> int:
+        with self._lock:
+            return self._generations.get(owner_id, 0)
+
+    def set(self, owner_id: int, day: date, stats: schemas.DashboardStats, generation: int):
+        with self._lock:
+            if self._generations.get(owner_id, 0) == generation:
+                self._entries.set(owner_id, (day, stats))
+
+    def invalidate(self, owner_id: int):
+        with self._lock:
+            self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+            self._entries.delete(owner_id)
+
+    def adjust(self, owner_id: int, **deltas: int):
+        with self._lock:
+            self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+            entry = self._entries.get(owner_id)
+            if entry is not None:
+                day, stats = entry
+                updated = stats.model_copy(update={
+                    name: getattr(stats, name) + delta for name, delta in deltas.items()
+                })
+                self._entries.replace(owner_id, (day, updated))
+
+
+def create_dashboard_cache() -> DashboardStatsCache:
+    if settings.dashboard_cache_backend == "memory":
+        return InMemoryDashboardStatsCache(
+            maxsize=settings.dashboard_cache_size, ttl=settings.dashboard_cache_ttl_seconds
+        )
+    return NullDashboardStatsCache()
+
+
+dashboard_cache = create_dashboard_cache()
@@ -1,11 +1,75 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from .config import settings
+from .db_metrics import PoolMetrics, instrument_engine, timed_pool_class
 
-engine = create_engine(settings.database_url)
+
+def _async_database_url(url: str) -> str:
+    """URL для асинхронного драйвера: postgresql:// -> postgresql+asyncpg://"""
+    db_url = make_url(url)
+    if db_url.drivername in ("postgresql", "postgresql+psycopg2"):
+        db_url = db_url.set(drivername="postgresql+asyncpg")
+    return db_url.render_as_string(hide_password=False)
+
+
+def _engine_options(
+    metrics: PoolMetrics, is_async: bool,
+    pool_size: int = settings.db_pool_size, max_overflow: int = settings.db_max_overflow
+) -> dict:
+    """Параметры пула из настроек"""
+    if settings.db_pgbouncer:
+        # Пулом управляет PgBouncer; в режиме transaction нельзя
+        # переиспользовать подготовленные выражения между транзакциями
+        options = {"poolclass": timed_pool_class(NullPool, metrics)}
+        if is_async:
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    return {
+        "poolclass": timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+# Метрики пулов, отдаются через /api/metrics/db-pool
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+bot_pool_metrics = PoolMetrics("bot")
+
+# Синхронный движок: init_db.py, миграции и скрипты
+engine = create_engine(settings.database_url, **_engine_options(sync_pool_metrics, is_async=False))
+instrument_engine(engine, sync_pool_metrics)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок: API и напоминания
+async_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    **_engine_options(async_pool_metrics, is_async=True)
+)
+instrument_engine(async_engine.sync_engine, async_pool_metrics)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Отдельный небольшой пул для обработчиков Telegram бота: поток обновлений
+# ждет свободного соединения в нем и не занимает соединения HTTP API
+bot_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    **_engine_options(bot_pool_metrics, is_async=True, pool_size=settings.telegram_db_pool_size, max_overflow=0)
+)
+instrument_engine(bot_engine.sync_engine, bot_pool_metrics)
+BotSessionLocal = async_sessionmaker(
+    bot_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -14,4 +78,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
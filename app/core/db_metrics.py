@@ -0,0 +1,86 @@
+import threading
+import time
+from typing import Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Счетчики пула соединений одного движка"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.engine = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits += 1
+            self.checkout_wait_total += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+
+    def record_timeout(self, seconds: float):
+        with self._lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.checkout_wait_total += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+
+    def _increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        """Текущее состояние пула и накопленные счетчики"""
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            waits = self.waits
+            return {
+                "name": self.name,
+                "pool_class": type(pool).__name__ if pool else None,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": self.checkouts - self.checkins,
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "checkout_wait_avg_ms": round(self.checkout_wait_total / waits * 1000, 3) if waits else 0.0,
+                "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 3),
+            }
+
+
+def timed_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """Подкласс пула, который замеряет ожидание свободного соединения и таймауты"""
+
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_timeout(time.perf_counter() - started)
+                raise
+            metrics.record_wait(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = base.__name__
+    return TimedPool
+
+
+def instrument_engine(sync_engine, metrics: PoolMetrics):
+    """Подписать счетчики на события пула движка (слушатели переживают dispose)"""
+    metrics.engine = sync_engine
+    event.listen(sync_engine.pool, "connect", lambda *args: metrics._increment("connects"))
+    event.listen(sync_engine.pool, "checkout", lambda *args: metrics._increment("checkouts"))
+    event.listen(sync_engine.pool, "checkin", lambda *args: metrics._increment("checkins"))
+    event.listen(sync_engine.pool, "invalidate", lambda *args: metrics._increment("invalidations"))
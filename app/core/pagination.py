@@ -0,0 +1,28 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+# Заголовок ответа со ссылкой на следующую страницу (keyset-пагинация)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Упаковать ключ последней строки страницы в непрозрачный курсор"""
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Распаковать курсор; при повреждении выбрасывает ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Некорректный курсор") from e
+    if not isinstance(values, list):
+        raise ValueError("Некорректный курсор")
+    return values
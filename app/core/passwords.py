@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import settings
+from ..crud import crud
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь на хеширование паролей заполнена"""
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей (bcrypt) в отдельном ограниченном пуле потоков.
+
+    bcrypt тратит 100–300 мс CPU на вызов. Выделенный пул не дает волне входов
+    занять общий threadpool и цикл событий, а лимит очереди отклоняет лишние
+    запросы сразу, вместо того чтобы копить их.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._run(crud.get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(crud.verify_password, password, hashed_password)
+
+    async def _run(self, fn, *args):
+        # Счетчик меняется только из цикла событий, блокировка не нужна
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
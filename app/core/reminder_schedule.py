@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import settings
+
+
+class ReminderSchedule:
+    """Упорядоченное по времени расписание напоминаний (куча в памяти).
+
+    Хранит момент отправки напоминания для каждой активной записи:
+    datetime записи минус settings.reminder_hours_before (в UTC, как и
+    выборка напоминаний в crud). Изменения записей через crud обновляют
+    расписание сразу, а периодическая сверка с базой (load) подхватывает
+    то, что изменилось в обход этого процесса.
+
+    Удаление ленивое: в куче остаются устаревшие элементы, актуальный
+    момент записи хранится в _due. Раньше срока ничего не отправляется:
+    сработавшие записи перепроверяются запросом к базе.
+    """
+
+    def __init__(self, hours_before: int = settings.reminder_hours_before):
+        self.offset = timedelta(hours=hours_before)
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+        self._in_flight: Set[int] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Привязать к циклу событий, в котором ждет таймер"""
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, appointment_id: int, appointment_datetime: datetime):
+        """Поставить (или перенести) напоминание для записи"""
+        if self._loop is None:
+            # Напоминания рассылает другой процесс — он узнает о записи при сверке
+            return
+        due_at = appointment_datetime - self.offset
+        with self._lock:
+            if self._due.get(appointment_id) == due_at:
+                return
+            head = self._heap[0][0] if self._heap else None
+            self._due[appointment_id] = due_at
+            heapq.heappush(self._heap, (due_at, appointment_id))
+        if head is None or due_at < head:
+            self._notify()
+
+    def discard(self, appointment_id: int):
+        """Убрать напоминание (запись отменена, удалена или уже напомнили)"""
+        with self._lock:
+            self._due.pop(appointment_id, None)
+
+    def load(self, appointments: Iterable[Tuple[int, datetime]], until: datetime):
+        """Сверить расписание с базой до момента until.
+
+        appointments — (id, datetime) всех записей, ждущих напоминания
+        с моментом отправки не позже until; остальные элементы до until
+        удаляются. Записи, которые сейчас отправляются, не трогаются.
+        """
+        fresh = {
+            appointment_id: appointment_datetime - self.offset
+            for appointment_id, appointment_datetime in appointments
+            if appointment_id not in self._in_flight
+        }
+        with self._lock:
+            due = {
+                appointment_id: due_at for appointment_id, due_at in self._due.items()
+                if due_at > until and appointment_id not in fresh
+            }
+            due.update(fresh)
+            self._due = due
+            self._heap = [(due_at, appointment_id) for appointment_id, due_at in due.items()]
+            heapq.heapify(self._heap)
+        self._notify()
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[int]:
+        """Забрать записи, срок напоминания которых наступил; они помечаются отправляемыми"""
+        now = now or datetime.utcnow()
+        ids = []
+        with self._lock:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(ids) < limit):
+                _, appointment_id = heapq.heappop(self._heap)
+                del self._due[appointment_id]
+                ids.append(appointment_id)
+                self._drop_stale()
+            self._in_flight.update(ids)
+        return ids
+
+    def done(self, appointment_ids: Iterable[int]):
+        """Отправка завершена (успешно или нет) — сверка снова может их ставить"""
+        with self._lock:
+            self._in_flight.difference_update(appointment_ids)
+
+    async def wait(self, max_seconds: float):
+        """Ждать ближайшего срока, изменения расписания или max_seconds"""
+        next_due = self.next_due()
+        timeout = max_seconds
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _notify(self):
+        # crud может выполняться не в потоке цикла событий
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+# Глобальное расписание процесса
+reminder_schedule = ReminderSchedule()
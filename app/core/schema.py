@@ -0,0 +1,36 @@
+"""Версия схемы базы: таблицы создает и меняет только Alembic.
+
+Веб-процесс и воркер при старте проверяют, что база на последней
+миграции, и не запускаются на старой схеме — иначе запросы падали бы
+на отсутствующих столбцах. Миграции применяет init_db.py.
+"""
+from pathlib import Path
+from typing import Set
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from .database import async_engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+def _current_revisions(connection) -> Set[str]:
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+async def check_schema_revision():
+    """RuntimeError, если база не на последней миграции"""
+    expected = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    async with async_engine.connect() as conn:
+        current = await conn.run_sync(_current_revisions)
+    if current != expected:
+        raise RuntimeError(
+            f"Схема базы на ревизии {', '.join(sorted(current)) or 'без миграций'}, "
+            f"нужна {', '.join(sorted(expected))}: примените миграции (python init_db.py)"
+        )
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .config import settings
+from ..schemas import schemas
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class ServiceCatalogSnapshot:
+    """Неизменяемый снимок каталога услуг одной версии"""
+    version: int
+    services: List[schemas.Service]  # Активные, по id
+    by_id: Dict[int, schemas.Service]  # Все, включая неактивные
+    json_by_id: Dict[int, bytes]  # Готовый JSON каждой услуги для API
+    etags: Dict[int, str]
+    etag: str  # Хеш содержимого списка активных услуг
+
+    @classmethod
+    def build(cls, version: int, services: List[schemas.Service]) -> "ServiceCatalogSnapshot":
+        json_by_id = {service.id: service.model_dump_json().encode() for service in services}
+        active = [service for service in services if service.is_active]
+        return cls(
+            version=version,
+            services=active,
+            by_id={service.id: service for service in services},
+            json_by_id=json_by_id,
+            etags={service_id: _digest(data) for service_id, data in json_by_id.items()},
+            etag=_digest(b"\n".join(json_by_id[service.id] for service in active)),
+        )
+
+    def list_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        return b"[" + b",".join(self.json_by_id[service.id] for service in self.services[skip:skip + limit]) + b"]"
+
+
+class ServiceCatalog:
+    """Каталог услуг в памяти процесса для бота и публичного API.
+
+    Услуги меняются редко, поэтому каталог загружается целиком одним
+    запросом и отдается без обращения к базе. crud.create_service и
+    update_service сбрасывают его и увеличивают версию: снимок, загруженный
+    до изменения, не будет сохранен после него. Изменения из других
+    процессов видны не позже чем через ttl.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot: Optional[ServiceCatalogSnapshot] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self) -> Optional[ServiceCatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return snapshot
+
+    def set(self, services: List[schemas.Service], version: int) -> ServiceCatalogSnapshot:
+        """Сохранить загруженный каталог, если с момента version он не менялся"""
+        snapshot = ServiceCatalogSnapshot.build(version, services)
+        with self._lock:
+            if self._version == version:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+
+service_catalog = ServiceCatalog(ttl=settings.service_catalog_ttl_seconds)
@@ -0,0 +1,229 @@
+"""Асинхронные CRUD операции для AsyncSession.
+
+Запросы живут в crud.py и выполняются через AsyncSession.run_sync: ORM-код
+остается одним, а ввод-вывод идет через asyncpg и не блокирует цикл событий.
+CPU-тяжелое хеширование паролей (bcrypt) выполняется в ограниченном пуле
+core.passwords; при переполнении очереди выбрасывается PasswordHasherBusy.
+"""
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from ..core.passwords import password_hasher
+from ..schemas import schemas
+
+
+# User CRUD
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user, user_id)
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_user_by_email, email)
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    """Создать пользователя; на время хеширования соединение возвращается в пул"""
+    await db.close()
+    hashed_password = await password_hasher.hash(user.password)
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """Проверить пароль; на время проверки соединение возвращается в пул"""
+    user = await get_user_by_email(db, email)
+    await db.close()
+    if not user:
+        return False
+    if not await password_hasher.verify(password, user.password_hash):
+        return False
+    return user
+
+
+# Refresh tokens
+async def create_refresh_token(db: AsyncSession, jti: str, user_id: int, family_id: str, expires_at: datetime):
+    return await db.run_sync(crud.create_refresh_token, jti, user_id, family_id, expires_at)
+
+
+async def rotate_refresh_token(db: AsyncSession, jti: str, new_jti: str, expires_at: datetime):
+    return await db.run_sync(crud.rotate_refresh_token, jti, new_jti, expires_at)
+
+
+async def revoke_refresh_token_family(db: AsyncSession, family_id: str):
+    return await db.run_sync(crud.revoke_refresh_token_family, family_id)
+
+
+async def get_refresh_token(db: AsyncSession, jti: str):
+    return await db.run_sync(crud.get_refresh_token, jti)
+
+
+# Client CRUD
+async def get_clients(
+    db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    return await db.run_sync(crud.get_clients, owner_id, skip, limit, after_id)
+
+
+async def get_client(db: AsyncSession, client_id: int, owner_id: int):
+    return await db.run_sync(crud.get_client, client_id, owner_id)
+
+
+async def get_client_by_phone(db: AsyncSession, phone: str, owner_id: int):
+    return await db.run_sync(crud.get_client_by_phone, phone, owner_id)
+
+
+async def get_client_by_telegram_id(db: AsyncSession, telegram_id: str):
+    return await db.run_sync(crud.get_client_by_telegram_id, telegram_id)
+
+
+async def get_client_by_telegram_username(db: AsyncSession, telegram_username: str):
+    return await db.run_sync(crud.get_client_by_telegram_username, telegram_username)
+
+
+async def get_client_identity_by_telegram_id(db: AsyncSession, telegram_id: str):
+    return await db.run_sync(crud.get_client_identity_by_telegram_id, telegram_id)
+
+
+async def get_client_identity_by_telegram_username(db: AsyncSession, telegram_username: str):
+    return await db.run_sync(crud.get_client_identity_by_telegram_username, telegram_username)
+
+
+async def client_exists(db: AsyncSession, client_id: int):
+    return await db.run_sync(crud.client_exists, client_id)
+
+
+async def set_client_telegram_id(db: AsyncSession, client_id: int, telegram_id: str):
+    return await db.run_sync(crud.set_client_telegram_id, client_id, telegram_id)
+
+
+async def create_client(db: AsyncSession, client: schemas.ClientCreate, owner_id: int):
+    return await db.run_sync(crud.create_client, client, owner_id)
+
+
+async def get_client_owners_by_phone(db: AsyncSession, phones: List[str]):
+    return await db.run_sync(crud.get_client_owners_by_phone, phones)
+
+
+async def insert_clients(db: AsyncSession, clients: List[dict], owner_id: int):
+    return await db.run_sync(crud.insert_clients, clients, owner_id)
+
+
+async def update_client(db: AsyncSession, client_id: int, client: schemas.ClientUpdate, owner_id: int):
+    return await db.run_sync(crud.update_client, client_id, client, owner_id)
+
+
+async def delete_client(db: AsyncSession, client_id: int, owner_id: int):
+    return await db.run_sync(crud.delete_client, client_id, owner_id)
+
+
+# Service CRUD
+async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return await db.run_sync(crud.get_services, skip, limit)
+
+
+async def get_service(db: AsyncSession, service_id: int):
+    return await db.run_sync(crud.get_service, service_id)
+
+
+async def get_service_catalog(db: AsyncSession):
+    return await db.run_sync(crud.get_service_catalog)
+
+
+async def create_service(db: AsyncSession, service: schemas.ServiceCreate):
+    return await db.run_sync(crud.create_service, service)
+
+
+async def update_service(db: AsyncSession, service_id: int, service: schemas.ServiceUpdate):
+    return await db.run_sync(crud.update_service, service_id, service)
+
+
+# Appointment CRUD
+async def get_appointments(
+    db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+):
+    return await db.run_sync(crud.get_appointments, owner_id, skip, limit, after)
+
+
+async def get_appointment(db: AsyncSession, appointment_id: int, owner_id: int):
+    return await db.run_sync(crud.get_appointment, appointment_id, owner_id)
+
+
+async def get_appointments_by_date(db: AsyncSession, owner_id: int, target_date: date):
+    return await db.run_sync(crud.get_appointments_by_date, owner_id, target_date)
+
+
+async def get_upcoming_appointments(db: AsyncSession, owner_id: int, days_ahead: int = 7):
+    return await db.run_sync(crud.get_upcoming_appointments, owner_id, days_ahead)
+
+
+async def get_client_upcoming_appointments(db: AsyncSession, client_id: int):
+    return await db.run_sync(crud.get_client_upcoming_appointments, client_id)
+
+
+async def get_client_upcoming_appointments_page(db: AsyncSession, client_id: int, skip: int = 0, limit: int = 5):
+    return await db.run_sync(crud.get_client_upcoming_appointments_page, client_id, skip, limit)
+
+
+async def get_busy_intervals(db: AsyncSession, owner_id: int, start: datetime, end: datetime):
+    return await db.run_sync(crud.get_busy_intervals, owner_id, start, end)
+
+
+async def create_appointment(db: AsyncSession, appointment: schemas.AppointmentCreate, owner_id: int):
+    return await db.run_sync(crud.create_appointment, appointment, owner_id)
+
+
+async def update_appointment(
+    db: AsyncSession, appointment_id: int, appointment: schemas.AppointmentUpdate, owner_id: int
+):
+    return await db.run_sync(crud.update_appointment, appointment_id, appointment, owner_id)
+
+
+async def cancel_client_appointment(db: AsyncSession, appointment_id: int, client_id: int):
+    return await db.run_sync(crud.cancel_client_appointment, appointment_id, client_id)
+
+
+async def delete_appointment(db: AsyncSession, appointment_id: int, owner_id: int):
+    return await db.run_sync(crud.delete_appointment, appointment_id, owner_id)
+
+
+# Batch operations
+async def batch_clients(db: AsyncSession, operations: list, owner_id: int):
+    return await db.run_sync(crud.batch_clients, operations, owner_id)
+
+
+async def batch_appointments(db: AsyncSession, operations: list, owner_id: int):
+    return await db.run_sync(crud.batch_appointments, operations, owner_id)
+
+
+# Dashboard stats
+async def get_dashboard_stats(db: AsyncSession, owner_id: int):
+    return await db.run_sync(crud.get_dashboard_stats, owner_id)
+
+
+# Appointments needing reminders
+async def get_appointments_needing_reminders(
+    db: AsyncSession, hours_before: int = 24, appointment_ids: Optional[List[int]] = None
+):
+    return await db.run_sync(crud.get_appointments_needing_reminders, hours_before, appointment_ids)
+
+
+async def claim_reminders(
+    db: AsyncSession, worker_id: str, hours_before: int, limit: int, lease_seconds: int,
+    appointment_ids: Optional[List[int]] = None
+):
+    return await db.run_sync(crud.claim_reminders, worker_id, hours_before, limit, lease_seconds, appointment_ids)
+
+
+async def get_reminder_schedule(db: AsyncSession, hours_before: int, until: datetime):
+    return await db.run_sync(crud.get_reminder_schedule, hours_before, until)
+
+
+async def mark_reminder_sent(db: AsyncSession, appointment_id: int):
+    return await db.run_sync(crud.mark_reminder_sent, appointment_id)
+
+
+async def mark_reminders_sent(db: AsyncSession, appointment_ids: List[int]):
+    return await db.run_sync(crud.mark_reminders_sent, appointment_ids)
@@ -1,9 +1,18 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import (
+    and_, bindparam, delete, insert, null, or_, func, literal, literal_column, tuple_, union_all, update,
+    select as db_select
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime, date, timedelta
 from passlib.context import CryptContext
 
+from ..core.bot_cache import client_appointments_cache, client_identity_cache
+from ..core.dashboard_cache import dashboard_cache, local_today
+from ..core.reminder_schedule import reminder_schedule
+from ..core.service_catalog import service_catalog
 from ..models import models
 from ..schemas import schemas
 
@@ -27,8 +36,9 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         password_hash=hashed_password,
@@ -47,11 +57,83 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
+# Refresh tokens
+def create_refresh_token(db: Session, jti: str, user_id: int, family_id: str, expires_at: datetime):
+    db_token = models.RefreshToken(
+        jti=jti, user_id=user_id, family_id=family_id, expires_at=expires_at
+    )
+    db.add(db_token)
+    db.commit()
+    return db_token
+
+
+def rotate_refresh_token(db: Session, jti: str, new_jti: str, expires_at: datetime):
+    """Отозвать действующий токен и выпустить следующий в том же семействе.
+
+    Отзыв — один атомарный UPDATE, поэтому из двух одновременных ротаций
+    одного токена успешна только одна. Если токен уже отозван (повторное
+    использование), отзывается все семейство. Возвращает новый токен или None.
+    """
+    now = datetime.utcnow()
+    rotated = db.execute(
+        update(models.RefreshToken)
+        .where(and_(
+            models.RefreshToken.jti == jti,
+            models.RefreshToken.revoked_at.is_(None),
+            models.RefreshToken.expires_at > now
+        ))
+        .values(revoked_at=now)
+        .returning(models.RefreshToken.user_id, models.RefreshToken.family_id)
+    ).first()
+    if rotated is None:
+        db_token = db.query(models.RefreshToken).filter(models.RefreshToken.jti == jti).first()
+        if db_token and db_token.revoked_at is not None:
+            revoke_refresh_token_family(db, db_token.family_id)
+        else:
+            db.rollback()
+        return None
+
+    db_token = models.RefreshToken(
+        jti=new_jti, user_id=rotated.user_id, family_id=rotated.family_id, expires_at=expires_at
+    )
+    db.add(db_token)
+    db.commit()
+    return db_token
+
+
+def revoke_refresh_token_family(db: Session, family_id: str):
+    db.execute(
+        update(models.RefreshToken)
+        .where(and_(
+            models.RefreshToken.family_id == family_id,
+            models.RefreshToken.revoked_at.is_(None)
+        ))
+        .values(revoked_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def get_refresh_token(db: Session, jti: str):
+    return db.query(models.RefreshToken).filter(models.RefreshToken.jti == jti).first()
+
+
 # Client CRUD
-def get_clients(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Client).filter(
+def get_clients(
+    db: Session, owner_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """Клиенты по возрастанию id.
+
+    С after_id — keyset-пагинация (поиск по индексу owner_id, id),
+    без него — совместимый режим skip/limit с тем же порядком.
+    """
+    query = db.query(models.Client).filter(
         models.Client.owner_id == owner_id
-    ).offset(skip).limit(limit).all()
+    ).order_by(models.Client.id)
+    if after_id is not None:
+        query = query.filter(models.Client.id > after_id)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 
 def get_client(db: Session, client_id: int, owner_id: int):
@@ -72,30 +154,154 @@ def get_client_by_telegram_id(db: Session, telegram_id: str):
     ).first()
 
 
+def get_client_by_telegram_username(db: Session, telegram_username: str):
+    return db.query(models.Client).filter(
+        models.Client.telegram_username == telegram_username
+    ).first()
+
+
+def _client_identity_query(db: Session):
+    return db.query(
+        models.Client.id, models.Client.owner_id, models.Client.full_name, models.Client.telegram_id
+    )
+
+
+def get_client_identity_by_telegram_id(db: Session, telegram_id: str) -> Optional[schemas.ClientIdentity]:
+    """Клиент по Telegram ID: из кеша, при промахе — только нужные столбцы"""
+    key = ("id", telegram_id)
+    identity = client_identity_cache.get(key)
+    if identity is None:
+        row = _client_identity_query(db).filter(models.Client.telegram_id == telegram_id).first()
+        if row is None:
+            return None
+        identity = schemas.ClientIdentity.model_validate(row._mapping)
+        client_identity_cache.set(key, identity)
+    return identity
+
+
+def get_client_identity_by_telegram_username(
+    db: Session, telegram_username: str
+) -> Optional[schemas.ClientIdentity]:
+    """Клиент по username в Telegram (индекс ix_clients_telegram_username), через кеш"""
+    key = ("username", telegram_username)
+    identity = client_identity_cache.get(key)
+    if identity is None:
+        row = _client_identity_query(db).filter(models.Client.telegram_username == telegram_username).first()
+        if row is None:
+            return None
+        identity = schemas.ClientIdentity.model_validate(row._mapping)
+        client_identity_cache.set(key, identity)
+    return identity
+
+
+def client_exists(db: Session, client_id: int) -> bool:
+    return db.query(db_select(models.Client.id).where(models.Client.id == client_id).exists()).scalar()
+
+
+def forget_telegram_user(telegram_id: str, telegram_username: Optional[str] = None):
+    """Сбросить кеш клиентов бота для пользователя Telegram.
+
+    Кеш процесса не знает об изменениях клиента в других процессах (API),
+    поэтому бот сбрасывает его сам, когда клиента из кеша нет в базе.
+    """
+    client_identity_cache.delete(("id", telegram_id))
+    if telegram_username:
+        client_identity_cache.delete(("username", telegram_username))
+
+
+def _forget_client_identity(db_client: models.Client):
+    """Сбросить кеш клиентов бота по Telegram ID и username клиента"""
+    if db_client.telegram_id:
+        client_identity_cache.delete(("id", db_client.telegram_id))
+    if db_client.telegram_username:
+        client_identity_cache.delete(("username", db_client.telegram_username))
+
+
+def set_client_telegram_id(db: Session, client_id: int, telegram_id: str):
+    db_client = db.query(models.Client).filter(models.Client.id == client_id).first()
+    if db_client and not db_client.telegram_id:
+        db_client.telegram_id = telegram_id
+        db.commit()
+        db.refresh(db_client)
+        _forget_client_identity(db_client)
+    return db_client
+
+
 def create_client(db: Session, client: schemas.ClientCreate, owner_id: int):
     db_client = models.Client(**client.model_dump(), owner_id=owner_id)
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
+    dashboard_cache.adjust(owner_id, total_clients=1)
+    _forget_client_identity(db_client)
     return db_client
 
 
+def get_client_owners_by_phone(db: Session, phones: List[str]) -> Dict[str, int]:
+    """Владельцы клиентов с указанными телефонами (+<цифры>, как после normalize_phone).
+
+    Записанные телефоны сравниваются в том же нормализованном виде, так что
+    «8 (900) 123-45-67» в базе совпадет с +79001234567. Один запрос по
+    индексу ix_clients_phone_key.
+    """
+    if not phones:
+        return {}
+    phone_key = literal_column(models.CLIENT_PHONE_KEY)
+    return dict(db.execute(
+        db_select(phone_key, models.Client.owner_id).where(phone_key.in_(phones))
+    ).all())
+
+
+def insert_clients(db: Session, clients: List[dict], owner_id: int) -> List[str]:
+    """Вставить клиентов многострочными INSERT.
+
+    Список параметров SQLAlchemy отправляет пачками INSERT ... VALUES (...), (...)
+    с одним скомпилированным выражением (insertmanyvalues). Телефоны, занятые
+    к моменту вставки (параллельный импорт), пропускаются через
+    ON CONFLICT DO NOTHING. Возвращает телефоны вставленных клиентов.
+    """
+    if not clients:
+        return []
+    now = datetime.utcnow()
+    table = models.Client.__table__
+    inserted = db.execute(
+        pg_insert(table)
+        .on_conflict_do_nothing(index_elements=[table.c.phone])
+        .returning(table.c.phone),
+        [{**client, "owner_id": owner_id, "created_at": now, "updated_at": now} for client in clients]
+    ).scalars().all()
+    db.commit()
+    if inserted:
+        dashboard_cache.adjust(owner_id, total_clients=len(inserted))
+        inserted_phones = set(inserted)
+        for client in clients:
+            if client["phone"] in inserted_phones and client.get("telegram_username"):
+                client_identity_cache.delete(("username", client["telegram_username"]))
+    return inserted
+
+
 def update_client(db: Session, client_id: int, client: schemas.ClientUpdate, owner_id: int):
     db_client = get_client(db, client_id, owner_id)
     if db_client:
+        # Старые и новые ключи: username мог перейти от другого клиента
+        _forget_client_identity(db_client)
         for key, value in client.model_dump(exclude_unset=True).items():
             setattr(db_client, key, value)
         db_client.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_client)
+        _forget_client_identity(db_client)
     return db_client
 
 
 def delete_client(db: Session, client_id: int, owner_id: int):
     db_client = get_client(db, client_id, owner_id)
     if db_client:
+        _forget_client_identity(db_client)
         db.delete(db_client)
         db.commit()
+        dashboard_cache.adjust(owner_id, total_clients=-1)
+        client_appointments_cache.delete(client_id)
     return db_client
 
 
@@ -110,11 +316,23 @@ def get_service(db: Session, service_id: int):
     return db.query(models.Service).filter(models.Service.id == service_id).first()
 
 
+def get_service_catalog(db: Session):
+    """Каталог услуг из памяти; при промахе — все услуги одним запросом"""
+    catalog = service_catalog.get()
+    if catalog is not None:
+        return catalog
+
+    version = service_catalog.version
+    services = db.query(models.Service).order_by(models.Service.id).all()
+    return service_catalog.set([schemas.Service.model_validate(service) for service in services], version)
+
+
 def create_service(db: Session, service: schemas.ServiceCreate):
     db_service = models.Service(**service.model_dump())
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
+    service_catalog.invalidate()
     return db_service
 
 
@@ -125,18 +343,42 @@ def update_service(db: Session, service_id: int, service: schemas.ServiceUpdate)
             setattr(db_service, key, value)
         db.commit()
         db.refresh(db_service)
+        service_catalog.invalidate()
     return db_service
 
 
 # Appointment CRUD
-def get_appointments(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Appointment).filter(
+def _appointments_query(db: Session):
+    """Записи вместе с клиентом и услугой одним запросом (без ленивых загрузок при сериализации)"""
+    return db.query(models.Appointment).options(
+        joinedload(models.Appointment.client),
+        joinedload(models.Appointment.service)
+    )
+
+
+def get_appointments(
+    db: Session, owner_id: int, skip: int = 0, limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+):
+    """Записи по возрастанию (datetime, id).
+
+    С after — keyset-пагинация после указанной пары (datetime, id)
+    по индексу owner_id, datetime, id; без него — совместимый режим skip/limit.
+    """
+    query = _appointments_query(db).filter(
         models.Appointment.owner_id == owner_id
-    ).offset(skip).limit(limit).all()
+    ).order_by(models.Appointment.datetime, models.Appointment.id)
+    if after is not None:
+        query = query.filter(
+            tuple_(models.Appointment.datetime, models.Appointment.id) > tuple_(*after)
+        )
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 
 def get_appointment(db: Session, appointment_id: int, owner_id: int):
-    return db.query(models.Appointment).filter(
+    return _appointments_query(db).filter(
         and_(models.Appointment.id == appointment_id, models.Appointment.owner_id == owner_id)
     ).first()
 
@@ -145,7 +387,7 @@ def get_appointments_by_date(db: Session, owner_id: int, target_date: date):
     start_of_day = datetime.combine(target_date, datetime.min.time())
     end_of_day = datetime.combine(target_date, datetime.max.time())
     
-    return db.query(models.Appointment).filter(
+    return _appointments_query(db).filter(
         and_(
             models.Appointment.owner_id == owner_id,
             models.Appointment.datetime >= start_of_day,
@@ -158,7 +400,7 @@ def get_upcoming_appointments(db: Session, owner_id: int, days_ahead: int = 7):
     now = datetime.utcnow()
     future_date = now + timedelta(days=days_ahead)
     
-    return db.query(models.Appointment).filter(
+    return _appointments_query(db).filter(
         and_(
             models.Appointment.owner_id == owner_id,
             models.Appointment.datetime >= now,
@@ -168,68 +410,641 @@ def get_upcoming_appointments(db: Session, owner_id: int, days_ahead: int = 7):
     ).all()
 
 
+def get_client_upcoming_appointments(db: Session, client_id: int):
+    return _appointments_query(db).filter(
+        and_(
+            models.Appointment.client_id == client_id,
+            models.Appointment.datetime > datetime.now(),
+            models.Appointment.status.in_([models.AppointmentStatus.SCHEDULED, models.AppointmentStatus.CONFIRMED])
+        )
+    ).order_by(models.Appointment.datetime).all()
+
+
+REMINDER_STATUSES = (models.AppointmentStatus.SCHEDULED, models.AppointmentStatus.CONFIRMED)
+
+
+def _schedule_reminder(appointment: models.Appointment):
+    """Обновить расписание напоминаний после изменения записи"""
+    if appointment.status in REMINDER_STATUSES and not appointment.reminder_sent:
+        reminder_schedule.schedule(appointment.id, appointment.datetime)
+    else:
+        reminder_schedule.discard(appointment.id)
+
+
+def get_client_upcoming_appointments_page(db: Session, client_id: int, skip: int = 0, limit: int = 5):
+    """Страница предстоящих записей клиента с названием услуги — один запрос.
+
+    Только нужные столбцы через JOIN с services, порядок и фильтр по индексу
+    (client_id, datetime). Возвращает limit + 1 строк: лишняя означает,
+    что есть следующая страница.
+    """
+    return db.execute(
+        db_select(
+            models.Appointment.id,
+            models.Appointment.datetime,
+            models.Appointment.status,
+            models.Appointment.notes,
+            models.Service.name.label("service_name")
+        )
+        .join(models.Service, models.Service.id == models.Appointment.service_id)
+        .where(
+            and_(
+                models.Appointment.client_id == client_id,
+                models.Appointment.datetime > datetime.now(),
+                models.Appointment.status.in_(REMINDER_STATUSES)
+            )
+        )
+        .order_by(models.Appointment.datetime, models.Appointment.id)
+        .offset(skip)
+        .limit(limit + 1)
+    ).all()
+
+
+def get_busy_intervals(db: Session, owner_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+    """Занятые интервалы (начало, конец) владельца, пересекающие [start, end) — один запрос.
+
+    Условие совпадает с ограничением ex_appointments_owner_no_overlap,
+    поэтому поиск идет по его GiST-индексу.
+    """
+    return [
+        tuple(row) for row in db.execute(
+            db_select(models.Appointment.datetime, models.Appointment.end_datetime)
+            .where(
+                and_(
+                    models.Appointment.owner_id == owner_id,
+                    models.Appointment.status.in_(REMINDER_STATUSES),
+                    func.tsrange(models.Appointment.datetime, models.Appointment.end_datetime)
+                    .op("&&")(func.tsrange(start, end))
+                )
+            )
+        ).all()
+    ]
+
+
+class AppointmentOverlapError(Exception):
+    """Время записи пересекается с другой активной записью владельца"""
+
+
+class ClientNotFoundError(Exception):
+    """Клиента записи уже нет в базе (например, удален, пока бот помнил его в кеше)"""
+
+
+# Имя внешнего ключа appointments.client_id, которое дает ему PostgreSQL
+APPOINTMENT_CLIENT_FOREIGN_KEY = "appointments_client_id_fkey"
+
+
+class ServiceNotFoundError(Exception):
+    """Услуги записи нет в базе"""
+
+
+class ServiceDurationError(Exception):
+    """У услуги не задана длительность — конец записи не вычислить"""
+
+
+def appointment_end(start: datetime, duration_minutes: Optional[int]) -> datetime:
+    """Конец записи: начало плюс длительность услуги.
+
+    Единственное место этого расчета: одиночные и пакетные операции берут
+    длительность из базы в своей транзакции и считают конец здесь.
+    """
+    if duration_minutes is None:
+        raise ServiceDurationError()
+    return start + timedelta(minutes=duration_minutes)
+
+
+def _service_duration(db: Session, service_id: int) -> Optional[int]:
+    row = db.execute(
+        db_select(models.Service.duration_minutes).where(models.Service.id == service_id)
+    ).first()
+    if row is None:
+        raise ServiceNotFoundError()
+    return row.duration_minutes
+
+
+def _commit_appointment(db: Session):
+    """Зафиксировать запись; пересечение по ограничению — AppointmentOverlapError,
+    клиент удален параллельно — ClientNotFoundError"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if models.APPOINTMENT_OVERLAP_CONSTRAINT in str(e.orig):
+            raise AppointmentOverlapError() from e
+        if APPOINTMENT_CLIENT_FOREIGN_KEY in str(e.orig):
+            raise ClientNotFoundError() from e
+        raise
+
+
 def create_appointment(db: Session, appointment: schemas.AppointmentCreate, owner_id: int):
-    db_appointment = models.Appointment(**appointment.model_dump(), owner_id=owner_id)
+    db_appointment = models.Appointment(
+        **appointment.model_dump(), owner_id=owner_id,
+        end_datetime=appointment_end(appointment.datetime, _service_duration(db, appointment.service_id))
+    )
     db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    _commit_appointment(db)
+    dashboard_cache.invalidate(owner_id)
+    client_appointments_cache.delete(db_appointment.client_id)
+    db_appointment = get_appointment(db, db_appointment.id, owner_id)
+    _schedule_reminder(db_appointment)
     return db_appointment
 
 
 def update_appointment(db: Session, appointment_id: int, appointment: schemas.AppointmentUpdate, owner_id: int):
     db_appointment = get_appointment(db, appointment_id, owner_id)
     if db_appointment:
-        for key, value in appointment.model_dump(exclude_unset=True).items():
+        changes = appointment.model_dump(exclude_unset=True)
+        for key, value in changes.items():
             setattr(db_appointment, key, value)
+        if "datetime" in changes:
+            db_appointment.end_datetime = appointment_end(
+                db_appointment.datetime, _service_duration(db, db_appointment.service_id)
+            )
         db_appointment.updated_at = datetime.utcnow()
+        _commit_appointment(db)
+        dashboard_cache.invalidate(owner_id)
+        client_appointments_cache.delete(db_appointment.client_id)
+        db_appointment = get_appointment(db, appointment_id, owner_id)
+        _schedule_reminder(db_appointment)
+    return db_appointment
+
+
+def cancel_client_appointment(db: Session, appointment_id: int, client_id: int):
+    db_appointment = db.query(models.Appointment).filter(
+        and_(models.Appointment.id == appointment_id, models.Appointment.client_id == client_id)
+    ).first()
+    if db_appointment:
+        db_appointment.status = models.AppointmentStatus.CANCELLED
         db.commit()
-        db.refresh(db_appointment)
+        dashboard_cache.invalidate(db_appointment.owner_id)
+        client_appointments_cache.delete(client_id)
+        reminder_schedule.discard(appointment_id)
     return db_appointment
 
 
 def delete_appointment(db: Session, appointment_id: int, owner_id: int):
     db_appointment = get_appointment(db, appointment_id, owner_id)
     if db_appointment:
+        client_id = db_appointment.client_id
         db.delete(db_appointment)
         db.commit()
+        dashboard_cache.invalidate(owner_id)
+        client_appointments_cache.delete(client_id)
+        reminder_schedule.discard(appointment_id)
     return db_appointment
 
 
+# Batch operations
+BatchItems = List[Tuple[int, object]]  # (позиция в запросе, операция)
+BatchConflict = Tuple[int, str]  # (статус операции, ошибка)
+
+
+def _batch_error(index: int, op: str, status: int, error: str) -> schemas.BatchItemResult:
+    return schemas.BatchItemResult(index=index, op=op, status=status, error=error)
+
+
+def _apply_batch(
+    db: Session, items: BatchItems,
+    apply: Callable[[BatchItems], Dict[int, schemas.BatchItemResult]],
+    conflict: Callable[[IntegrityError], Optional[BatchConflict]]
+) -> Dict[int, schemas.BatchItemResult]:
+    """Применить операции пакета в одной транзакции.
+
+    Сначала все операции сразу пачечными выражениями. Если база отклонила
+    пачку конфликтом (conflict не None), операции повторяются по одной
+    в SAVEPOINT той же транзакции: конфликтующие получают статус и ошибку
+    из conflict, остальные применяются.
+    """
+    if not items:
+        return {}
+    try:
+        results = apply(items)
+        db.commit()
+        return results
+    except IntegrityError as e:
+        db.rollback()
+        if conflict(e) is None:
+            raise
+
+    results = {}
+    for index, op in items:
+        try:
+            with db.begin_nested():
+                results.update(apply([(index, op)]))
+        except IntegrityError as e:
+            item_conflict = conflict(e)
+            if item_conflict is None:
+                db.rollback()
+                raise
+            status, detail = item_conflict
+            results[index] = _batch_error(index, op.op, status, detail)
+    db.commit()
+    return results
+
+
+def _update_groups(rows: List[dict]) -> Dict[frozenset, List[dict]]:
+    """UPDATE по id пачками: строки с одинаковым набором полей — одно выражение executemany"""
+    groups: Dict[frozenset, List[dict]] = {}
+    for row in rows:
+        groups.setdefault(frozenset(key for key in row if key != "id"), []).append(row)
+    return groups
+
+
+def _bulk_update(db: Session, table, rows: List[dict]):
+    for keys, group in _update_groups(rows).items():
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values({key: bindparam(f"b_{key}") for key in keys}),
+            [{f"b_{key}": value for key, value in row.items()} for row in group]
+        )
+
+
+def _owned_batch_targets(
+    db: Session, owner_id: int, appointment_ids: Set[int], client_ids: Set[int], service_ids: Set[int]
+) -> Tuple[Dict[int, Tuple[Optional[int], Optional[int]]], Set[int], Dict[int, Optional[int]]]:
+    """Цели пакета одним запросом: записи владельца (id -> (client_id, длительность
+    их услуги)), клиенты владельца и длительности услуг новых записей (id -> минуты)"""
+    parts = []
+    if appointment_ids:
+        parts.append(
+            db_select(
+                literal("appointment").label("kind"), models.Appointment.id,
+                models.Appointment.client_id, models.Service.duration_minutes
+            )
+            .outerjoin(models.Service, models.Service.id == models.Appointment.service_id)
+            .where(and_(models.Appointment.owner_id == owner_id, models.Appointment.id.in_(appointment_ids)))
+        )
+    if client_ids:
+        parts.append(
+            db_select(literal("client").label("kind"), models.Client.id, null(), null())
+            .where(and_(models.Client.owner_id == owner_id, models.Client.id.in_(client_ids)))
+        )
+    if service_ids:
+        parts.append(
+            db_select(literal("service").label("kind"), models.Service.id, null(), models.Service.duration_minutes)
+            .where(models.Service.id.in_(service_ids))
+        )
+    if not parts:
+        return {}, set(), {}
+    appointments, clients, durations = {}, set(), {}
+    for kind, target_id, client_id, duration in db.execute(union_all(*parts) if len(parts) > 1 else parts[0]):
+        if kind == "appointment":
+            appointments[target_id] = (client_id, duration)
+        elif kind == "client":
+            clients.add(target_id)
+        else:
+            durations[target_id] = duration
+    return appointments, clients, durations
+
+
+SERVICE_DURATION_DETAIL = "У услуги не задана длительность"
+
+
+def _appointment_conflict(error: IntegrityError) -> Optional[BatchConflict]:
+    if models.APPOINTMENT_OVERLAP_CONSTRAINT in str(error.orig):
+        return 409, "Время пересекается с другой записью"
+    if APPOINTMENT_CLIENT_FOREIGN_KEY in str(error.orig):
+        # Клиента удалили между проверкой владельца и вставкой
+        return 404, "Клиент не найден"
+    return None
+
+
+def batch_appointments(db: Session, operations: list, owner_id: int) -> List[schemas.BatchItemResult]:
+    """Пакет операций с записями: одна проверка владельца, одна транзакция.
+
+    Длительности услуг читаются из базы тем же запросом, что и проверка
+    владельца, — как в create_appointment и update_appointment.
+    """
+    owned_appointments, owned_clients, durations = _owned_batch_targets(
+        db, owner_id,
+        {op.id for op in operations if op.op != "create"},
+        {op.data.client_id for op in operations if op.op == "create"},
+        {op.data.service_id for op in operations if op.op == "create"}
+    )
+
+    results: Dict[int, schemas.BatchItemResult] = {}
+    items: BatchItems = []
+    seen = set()
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            if op.data.client_id not in owned_clients:
+                results[index] = _batch_error(index, op.op, 404, "Клиент не найден")
+                continue
+            if op.data.service_id not in durations:
+                results[index] = _batch_error(index, op.op, 404, "Услуга не найдена")
+                continue
+            if durations[op.data.service_id] is None:
+                results[index] = _batch_error(index, op.op, 400, SERVICE_DURATION_DETAIL)
+                continue
+        elif op.id not in owned_appointments:
+            results[index] = _batch_error(index, op.op, 404, "Запись не найдена")
+            continue
+        elif op.id in seen:
+            results[index] = _batch_error(index, op.op, 400, "Запись уже изменяется в этом пакете")
+            continue
+        elif op.op == "update" and "datetime" in op.data.model_fields_set and owned_appointments[op.id][1] is None:
+            results[index] = _batch_error(index, op.op, 400, SERVICE_DURATION_DETAIL)
+            continue
+        else:
+            seen.add(op.id)
+        items.append((index, op))
+
+    table = models.Appointment.__table__
+
+    def apply(items: BatchItems) -> Dict[int, schemas.BatchItemResult]:
+        applied = {}
+        now = datetime.utcnow()
+        creates = [(index, op) for index, op in items if op.op == "create"]
+        if creates:
+            new_ids = db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                [
+                    {
+                        **op.data.model_dump(), "owner_id": owner_id,
+                        "end_datetime": appointment_end(op.data.datetime, durations[op.data.service_id]),
+                        "created_at": now, "updated_at": now,
+                    }
+                    for _, op in creates
+                ]
+            ).scalars().all()
+            for (index, op), new_id in zip(creates, new_ids):
+                applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=201, id=new_id)
+
+        updates = []
+        for index, op in items:
+            if op.op != "update":
+                continue
+            row = {"id": op.id, **op.data.model_dump(exclude_unset=True), "updated_at": now}
+            if "datetime" in row:
+                row["end_datetime"] = appointment_end(row["datetime"], owned_appointments[op.id][1])
+            updates.append(row)
+            applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=200, id=op.id)
+        _bulk_update(db, table, updates)
+
+        deletes = [(index, op) for index, op in items if op.op == "delete"]
+        if deletes:
+            db.execute(delete(table).where(table.c.id.in_([op.id for _, op in deletes])))
+            for index, op in deletes:
+                applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=200, id=op.id)
+        return applied
+
+    applied = _apply_batch(db, items, apply, _appointment_conflict)
+    results.update(applied)
+
+    done = [result for result in applied.values() if result.status < 400]
+    if done:
+        dashboard_cache.invalidate(owner_id)
+        changed_ids = [result.id for result in done if result.op != "delete"]
+        if changed_ids:
+            for row in db.execute(
+                db_select(
+                    models.Appointment.id, models.Appointment.datetime, models.Appointment.status,
+                    models.Appointment.reminder_sent, models.Appointment.client_id
+                ).where(models.Appointment.id.in_(changed_ids))
+            ):
+                client_appointments_cache.delete(row.client_id)
+                _schedule_reminder(row)
+        for result in done:
+            if result.op == "delete":
+                client_appointments_cache.delete(owned_appointments[result.id][0])
+                reminder_schedule.discard(result.id)
+    return [results[index] for index in range(len(operations))]
+
+
+def _client_conflict(error: IntegrityError) -> Optional[BatchConflict]:
+    if "ix_clients_phone" in str(error.orig):
+        return 409, "Клиент с таким телефоном уже существует"
+    return None
+
+
+def batch_clients(db: Session, operations: list, owner_id: int) -> List[schemas.BatchItemResult]:
+    """Пакет операций с клиентами: одна проверка владельца, одна транзакция"""
+    target_ids = {op.id for op in operations if op.op != "create"}
+    owned = {
+        row.id: row for row in db.execute(
+            db_select(models.Client.id, models.Client.telegram_id, models.Client.telegram_username)
+            .where(and_(models.Client.owner_id == owner_id, models.Client.id.in_(target_ids)))
+        )
+    } if target_ids else {}
+
+    results: Dict[int, schemas.BatchItemResult] = {}
+    items: BatchItems = []
+    seen = set()
+    for index, op in enumerate(operations):
+        if op.op != "create":
+            if op.id not in owned:
+                results[index] = _batch_error(index, op.op, 404, "Клиент не найден")
+                continue
+            if op.id in seen:
+                results[index] = _batch_error(index, op.op, 400, "Клиент уже изменяется в этом пакете")
+                continue
+            seen.add(op.id)
+        items.append((index, op))
+
+    table = models.Client.__table__
+
+    def apply(items: BatchItems) -> Dict[int, schemas.BatchItemResult]:
+        applied = {}
+        now = datetime.utcnow()
+        creates = [(index, op) for index, op in items if op.op == "create"]
+        if creates:
+            # Занятый телефон (в базе или раньше в этом же пакете) — 409 для операции
+            inserted = dict(db.execute(
+                pg_insert(table)
+                .on_conflict_do_nothing(index_elements=[table.c.phone])
+                .returning(table.c.phone, table.c.id),
+                [{**op.data.model_dump(), "owner_id": owner_id, "created_at": now, "updated_at": now}
+                 for _, op in creates]
+            ).all())
+            for index, op in creates:
+                new_id = inserted.pop(op.data.phone, None)
+                if new_id is None:
+                    applied[index] = _batch_error(index, op.op, 409, "Клиент с таким телефоном уже существует")
+                else:
+                    applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=201, id=new_id)
+
+        updates = []
+        for index, op in items:
+            if op.op == "update":
+                updates.append({"id": op.id, **op.data.model_dump(exclude_unset=True), "updated_at": now})
+                applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=200, id=op.id)
+        _bulk_update(db, table, updates)
+
+        deletes = [(index, op) for index, op in items if op.op == "delete"]
+        if deletes:
+            delete_ids = [op.id for _, op in deletes]
+            # Как при удалении через ORM: записи клиента остаются без клиента
+            db.execute(
+                update(models.Appointment.__table__)
+                .where(models.Appointment.client_id.in_(delete_ids))
+                .values(client_id=None)
+            )
+            db.execute(delete(table).where(table.c.id.in_(delete_ids)))
+            for index, op in deletes:
+                applied[index] = schemas.BatchItemResult(index=index, op=op.op, status=200, id=op.id)
+        return applied
+
+    applied = _apply_batch(db, items, apply, _client_conflict)
+    results.update(applied)
+
+    created = deleted = 0
+    for index, result in applied.items():
+        if result.status >= 400:
+            continue
+        op = operations[index]
+        if result.op == "create":
+            created += 1
+        else:
+            _forget_client_identity(owned[op.id])
+        if result.op == "delete":
+            deleted += 1
+            client_appointments_cache.delete(op.id)
+        elif op.data.telegram_username:
+            client_identity_cache.delete(("username", op.data.telegram_username))
+    if created or deleted:
+        dashboard_cache.adjust(owner_id, total_clients=created - deleted)
+    return [results[index] for index in range(len(operations))]
+
+
 # Dashboard stats
+def _dashboard_counters(owner_id: int, today: date, now: datetime) -> dict:
+    """Счетчики дашборда: поле DashboardStats -> агрегат по записям владельца.
+
+    Новый счетчик (например, отмененные записи или выручка) добавляется сюда
+    и полем в schemas.DashboardStats — запрос остается одним.
+    """
+    appointment = models.Appointment
+    active = appointment.status.in_([models.AppointmentStatus.SCHEDULED, models.AppointmentStatus.CONFIRMED])
+    start_of_day = datetime.combine(today, datetime.min.time())
+    end_of_day = datetime.combine(today, datetime.max.time())
+
+    return {
+        "total_clients": db_select(func.count(models.Client.id)).where(
+            models.Client.owner_id == owner_id
+        ).scalar_subquery(),
+        "total_appointments": func.count(appointment.id),
+        "today_appointments": func.count(appointment.id).filter(
+            and_(appointment.datetime >= start_of_day, appointment.datetime <= end_of_day)
+        ),
+        "upcoming_appointments": func.count(appointment.id).filter(
+            and_(appointment.datetime >= now, appointment.datetime <= now + timedelta(days=7), active)
+        ),
+    }
+
+
 def get_dashboard_stats(db: Session, owner_id: int):
-    total_clients = db.query(models.Client).filter(
-        models.Client.owner_id == owner_id
-    ).count()
-    
-    total_appointments = db.query(models.Appointment).filter(
-        models.Appointment.owner_id == owner_id
-    ).count()
-    
-    today = date.today()
-    today_appointments = len(get_appointments_by_date(db, owner_id, today))
-    
-    upcoming_appointments = len(get_upcoming_appointments(db, owner_id, 7))
-    
-    return schemas.DashboardStats(
-        total_clients=total_clients,
-        total_appointments=total_appointments,
-        today_appointments=today_appointments,
-        upcoming_appointments=upcoming_appointments
-    )
+    """Все счетчики дашборда одним агрегирующим запросом, без загрузки ORM-объектов.
+
+    Результат кешируется по владельцу до ближайшей записи в crud или до конца дня.
+    """
+    today = local_today()
+    stats = dashboard_cache.get(owner_id, today)
+    if stats is not None:
+        return stats
+
+    generation = dashboard_cache.generation(owner_id)
+    counters = _dashboard_counters(owner_id, today, datetime.utcnow())
+    row = db.execute(
+        db_select(*[expression.label(name) for name, expression in counters.items()])
+        .select_from(models.Appointment)
+        .where(models.Appointment.owner_id == owner_id)
+    ).one()
+    stats = schemas.DashboardStats(**row._mapping)
+    dashboard_cache.set(owner_id, today, stats, generation)
+    return stats
 
 
 # Appointments needing reminders
-def get_appointments_needing_reminders(db: Session, hours_before: int = 24):
-    reminder_time = datetime.utcnow() + timedelta(hours=hours_before)
+def appointments_needing_reminders_query(hours_before: int = 24, appointment_ids: Optional[List[int]] = None):
+    """SELECT записей, по которым пора отправить напоминание.
+
+    Клиент и услуга подгружаются тем же запросом; порядок по datetime
+    совпадает с частичным индексом ix_appointments_reminder_due.
+    appointment_ids ограничивает выборку записями, сработавшими в расписании.
+    """
+    now = datetime.utcnow()
+    reminder_time = now + timedelta(hours=hours_before)
     
-    return db.query(models.Appointment).filter(
+    query = db_select(models.Appointment).options(
+        joinedload(models.Appointment.client),
+        joinedload(models.Appointment.service)
+    ).where(
         and_(
             models.Appointment.datetime <= reminder_time,
-            models.Appointment.datetime > datetime.utcnow(),
+            models.Appointment.datetime > now,
             models.Appointment.reminder_sent == False,
-            models.Appointment.status.in_([models.AppointmentStatus.SCHEDULED, models.AppointmentStatus.CONFIRMED])
+            models.Appointment.status.in_(REMINDER_STATUSES)
+        )
+    )
+    if appointment_ids is not None:
+        query = query.where(models.Appointment.id.in_(appointment_ids))
+    return query.order_by(models.Appointment.datetime, models.Appointment.id)
+
+
+def get_reminder_schedule(db: Session, hours_before: int, until: datetime) -> List[Tuple[int, datetime]]:
+    """(id, datetime) записей, напоминание по которым наступает не позже until.
+
+    Только два столбца по частичному индексу ix_appointments_reminder_due —
+    дешевая сверка расписания напоминаний с базой.
+    """
+    rows = db.execute(
+        db_select(models.Appointment.id, models.Appointment.datetime).where(
+            and_(
+                models.Appointment.datetime <= until + timedelta(hours=hours_before),
+                models.Appointment.datetime > datetime.utcnow(),
+                models.Appointment.reminder_sent == False,
+                models.Appointment.status.in_(REMINDER_STATUSES)
+            )
         )
     ).all()
+    return [(row.id, row.datetime) for row in rows]
+
+
+def claim_reminders(
+    db: Session, worker_id: str, hours_before: int, limit: int, lease_seconds: int,
+    appointment_ids: Optional[List[int]] = None
+) -> List[int]:
+    """Захватить пачку записей для напоминания за этим воркером.
+
+    UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED LIMIT n)
+    RETURNING id: параллельные воркеры пропускают строки друг друга
+    и получают разные пачки. Захват действует lease_seconds — потом
+    строку может забрать другой воркер (если этот упал или не смог отправить).
+    """
+    now = datetime.utcnow()
+    candidates = db_select(models.Appointment.id).where(
+        and_(
+            models.Appointment.datetime <= now + timedelta(hours=hours_before),
+            models.Appointment.datetime > now,
+            models.Appointment.reminder_sent == False,
+            models.Appointment.status.in_(REMINDER_STATUSES),
+            or_(
+                models.Appointment.reminder_claimed_at == None,
+                models.Appointment.reminder_claimed_at < now - timedelta(seconds=lease_seconds)
+            )
+        )
+    )
+    if appointment_ids is not None:
+        candidates = candidates.where(models.Appointment.id.in_(appointment_ids))
+    candidates = candidates.order_by(
+        models.Appointment.datetime, models.Appointment.id
+    ).limit(limit).with_for_update(skip_locked=True)
+
+    claimed = db.execute(
+        update(models.Appointment)
+        .where(models.Appointment.id.in_(candidates.scalar_subquery()))
+        .values(reminder_claimed_at=now, reminder_claimed_by=worker_id)
+        .returning(models.Appointment.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return claimed
+
+
+def get_appointments_needing_reminders(
+    db: Session, hours_before: int = 24, appointment_ids: Optional[List[int]] = None
+):
+    return db.execute(appointments_needing_reminders_query(hours_before, appointment_ids)).scalars().all()
 
 
 def mark_reminder_sent(db: Session, appointment_id: int):
@@ -240,4 +1055,21 @@ def mark_reminder_sent(db: Session, appointment_id: int):
         appointment.reminder_sent = True
         db.commit()
         db.refresh(appointment)
-    return appointment
\ No newline at end of file
+        reminder_schedule.discard(appointment_id)
+    return appointment
+
+
+def mark_reminders_sent(db: Session, appointment_ids: List[int]):
+    """Отметить напоминания отправленными одним UPDATE ... WHERE id IN (...)"""
+    if not appointment_ids:
+        return 0
+    result = db.execute(
+        update(models.Appointment)
+        .where(models.Appointment.id.in_(appointment_ids))
+        .values(reminder_sent=True, reminder_claimed_at=None, reminder_claimed_by=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    for appointment_id in appointment_ids:
+        reminder_schedule.discard(appointment_id)
+    return result.rowcount
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
@@ -6,11 +5,14 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 
-from .core.database import engine, Base
+from .core.database import AsyncSessionLocal, async_engine, bot_engine
 from .core.config import settings
-from .api import auth, clients, services, appointments, dashboard
+from .core.schema import check_schema_revision
+from .core.passwords import password_hasher
+from .crud import async_crud
+from .api import auth, clients, services, appointments, dashboard, export, metrics, telegram
+from .services.background import start_background_services, start_webhook_receiver, stop_background_services
 from .services.telegram_bot import telegram_bot
-from .services.reminder_service import reminder_service
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -23,31 +25,30 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Запуск приложения...")
     
-    # Создаем таблицы базы данных
-    Base.metadata.create_all(bind=engine)
+    # Схему создают миграции (python init_db.py); на старой схеме не запускаемся
+    await check_schema_revision()
     
-    # Настраиваем и запускаем Telegram бота
-    if settings.telegram_bot_token:
-        try:
-            telegram_bot.setup_bot()
-            # Запускаем бота в фоновом режиме
-            asyncio.create_task(telegram_bot.start_polling())
-            logger.info("Telegram бот запущен")
-        except Exception as e:
-            logger.error(f"Ошибка запуска Telegram бота: {e}")
+    # Загружаем каталог услуг в память
+    async with AsyncSessionLocal() as db:
+        await async_crud.get_service_catalog(db)
     
-    # Запускаем сервис напоминаний
-    try:
-        reminder_service.start()
-        logger.info("Сервис напоминаний запущен")
-    except Exception as e:
-        logger.error(f"Ошибка запуска сервиса напоминаний: {e}")
+    # Бот и напоминания: здесь или в отдельном воркере (python -m app.worker)
+    if settings.run_background_services:
+        await start_background_services(serve_webhook=True)
+    else:
+        await start_webhook_receiver()
     
     yield
     
     # Shutdown
     logger.info("Остановка приложения...")
-    reminder_service.stop()
+    if settings.run_background_services:
+        await stop_background_services()
+    else:
+        await telegram_bot.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    await bot_engine.dispose()
 
 
 app = FastAPI(
@@ -69,6 +70,9 @@ app.include_router(clients.router, prefix="/api/clients", tags=["Клиенты"
 app.include_router(services.router, prefix="/api/services", tags=["Услуги"])
 app.include_router(appointments.router, prefix="/api/appointments", tags=["Записи"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Дашборд"])
+app.include_router(export.router, prefix="/api/export", tags=["Выгрузка"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Метрики"])
+app.include_router(telegram.router, prefix="/api/telegram", tags=["Telegram"])
 
 
 # Веб-интерфейс
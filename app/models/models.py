@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum, Index, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from ..core.database import Base
 
+_utcnow = datetime.utcnow
+
 
 class AppointmentStatus(enum.Enum):
     SCHEDULED = "scheduled"  # Запланирована
@@ -29,15 +32,32 @@ class User(Base):
     appointments = relationship("Appointment", back_populates="owner")
 
 
+# Телефон клиента в виде +<цифры>, как его приводит client_import.normalize_phone:
+# российские 8XXXXXXXXXX и XXXXXXXXXX без «+» — к +7. По этому выражению (и его
+# индексу) импорт находит уже записанные телефоны, в каком бы виде их ни ввели
+_PHONE_DIGITS = "regexp_replace(phone, '[^0-9]', '', 'g')"
+CLIENT_PHONE_KEY = (
+    f"'+' || CASE"
+    f" WHEN left(ltrim(phone), 1) = '+' THEN {_PHONE_DIGITS}"
+    f" WHEN {_PHONE_DIGITS} ~ '^8[0-9]{{10}}$' THEN '7' || substr({_PHONE_DIGITS}, 2)"
+    f" WHEN {_PHONE_DIGITS} ~ '^[0-9]{{10}}$' THEN '7' || {_PHONE_DIGITS}"
+    f" ELSE {_PHONE_DIGITS} END"
+)
+
+
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        Index("ix_clients_owner_id_id", "owner_id", "id"),
+        Index("ix_clients_phone_key", text(f"({CLIENT_PHONE_KEY})")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, nullable=False)
     phone = Column(String, unique=True, index=True)
     email = Column(String, index=True)
     telegram_id = Column(String, unique=True, index=True, nullable=True)
-    telegram_username = Column(String, nullable=True)
+    telegram_username = Column(String, nullable=True, index=True)
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -65,16 +85,46 @@ class Service(Base):
     appointments = relationship("Appointment", back_populates="service")
 
 
+APPOINTMENT_OVERLAP_CONSTRAINT = "ex_appointments_owner_no_overlap"
+
+
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_owner_id_datetime_id", "owner_id", "datetime", "id"),
+        # Предстоящие записи клиента (бот: «Мои записи»)
+        Index("ix_appointments_client_id_datetime", "client_id", "datetime"),
+        # Частичный индекс: только записи, по которым еще ждут напоминание
+        Index(
+            "ix_appointments_reminder_due", "datetime",
+            postgresql_where=text("reminder_sent = false AND status IN ('SCHEDULED', 'CONFIRMED')")
+        ),
+        # Активные записи владельца не пересекаются по времени [datetime, end_datetime).
+        # GiST-индекс ограничения проверяет пересечение при вставке, в том числе
+        # между параллельными транзакциями. owner_id сравнивается как диапазон
+        # из одного значения, чтобы не требовать расширение btree_gist
+        ExcludeConstraint(
+            (text("int4range(owner_id, owner_id, '[]')"), "&&"),
+            (text("tsrange(datetime, end_datetime)"), "&&"),
+            name=APPOINTMENT_OVERLAP_CONSTRAINT,
+            using="gist",
+            where=text("status IN ('SCHEDULED', 'CONFIRMED')")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     datetime = Column(DateTime, nullable=False)
+    # Конец записи: datetime плюс длительность услуги на момент записи
+    end_datetime = Column(DateTime, nullable=False)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.SCHEDULED)
     notes = Column(Text)
     reminder_sent = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Аренда напоминания процессом-рассыльщиком (истекает через reminder_claim_ttl_seconds)
+    reminder_claimed_at = Column(DateTime, nullable=True)
+    reminder_claimed_by = Column(String(64), nullable=True)
+    # Атрибут datetime выше перекрывает модуль в теле класса, поэтому берем функцию явно
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     
     # Foreign Keys
     client_id = Column(Integer, ForeignKey("clients.id"))
@@ -84,4 +134,23 @@ class Appointment(Base):
     # Связи
     client = relationship("Client", back_populates="appointments")
     service = relationship("Service", back_populates="appointments")
-    owner = relationship("User", back_populates="appointments")
\ No newline at end of file
+    owner = relationship("User", back_populates="appointments")
+
+
+class RefreshToken(Base):
+    """Выданные refresh-токены: ротация и отзыв.
+
+    Токен — JWT с jti; в таблице хранится только его состояние. Все токены,
+    полученные ротацией от одного входа, образуют семейство (family_id):
+    повторное предъявление уже отозванного токена отзывает все семейство.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    jti = Column(String(32), primary_key=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Foreign Keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Annotated, Literal, Optional, List, Union
 from datetime import datetime
 from ..models.models import AppointmentStatus
 
@@ -60,6 +60,28 @@ class Client(ClientBase):
         from_attributes = True
 
 
+class ClientImportRowError(BaseModel):
+    row: int  # Номер строки в файле (заголовок — строка 1)
+    phone: Optional[str] = None
+    error: str
+
+
+class ClientImportReport(BaseModel):
+    total: int
+    created: int
+    duplicates: int  # Телефон уже есть у вас или повторяется в файле
+    failed: int
+    errors: List[ClientImportRowError]  # Не больше CLIENT_IMPORT_MAX_ERRORS
+
+
+class ClientIdentity(BaseModel):
+    """Клиент, найденный по Telegram: все, что нужно обработчикам бота"""
+    id: int
+    owner_id: int
+    full_name: str
+    telegram_id: Optional[str] = None
+
+
 # Service schemas
 class ServiceBase(BaseModel):
     name: str
@@ -79,9 +101,19 @@ class ServiceUpdate(BaseModel):
     price: Optional[int] = None
     is_active: Optional[bool] = None
 
+    @field_validator("duration_minutes")
+    @classmethod
+    def duration_not_null(cls, value):
+        # Без длительности у записи не вычислить конец
+        if value is None:
+            raise ValueError("duration_minutes не может быть null")
+        return value
+
 
 class Service(ServiceBase):
     id: int
+    # Столбец допускает NULL: такая услуга не должна ломать весь каталог
+    duration_minutes: Optional[int] = None
     is_active: bool
     created_at: datetime
 
@@ -100,11 +132,24 @@ class AppointmentCreate(AppointmentBase):
     service_id: int
 
 
+# Поле datetime со значением по умолчанию перекрывает тип в теле класса,
+# и pydantic принимал бы только None — поэтому тип берем через псевдоним
+_datetime = datetime
+
+
 class AppointmentUpdate(BaseModel):
-    datetime: Optional[datetime] = None
+    datetime: Optional[_datetime] = None
     status: Optional[AppointmentStatus] = None
     notes: Optional[str] = None
 
+    @field_validator("datetime")
+    @classmethod
+    def datetime_not_null(cls, value):
+        # Поле можно не передавать, но явный null — не время записи
+        if value is None:
+            raise ValueError("datetime не может быть null")
+        return value
+
 
 class Appointment(AppointmentBase):
     id: int
@@ -119,10 +164,79 @@ class Appointment(AppointmentBase):
         from_attributes = True
 
 
+class AvailableSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+
+# Batch schemas: операции create/update/delete в одном запросе
+class BatchItemResult(BaseModel):
+    index: int  # Позиция операции в запросе
+    op: str
+    status: int  # 201 — создано, 200 — изменено или удалено, 4xx — ошибка операции
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ClientBatchCreate(BaseModel):
+    op: Literal["create"]
+    data: ClientCreate
+
+
+class ClientBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: ClientUpdate
+
+
+class ClientBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+ClientBatchOperation = Annotated[
+    Union[ClientBatchCreate, ClientBatchUpdate, ClientBatchDelete], Field(discriminator="op")
+]
+
+
+class ClientBatch(BaseModel):
+    operations: List[ClientBatchOperation]
+
+
+class AppointmentBatchCreate(BaseModel):
+    op: Literal["create"]
+    data: AppointmentCreate
+
+
+class AppointmentBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: AppointmentUpdate
+
+
+class AppointmentBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+AppointmentBatchOperation = Annotated[
+    Union[AppointmentBatchCreate, AppointmentBatchUpdate, AppointmentBatchDelete], Field(discriminator="op")
+]
+
+
+class AppointmentBatch(BaseModel):
+    operations: List[AppointmentBatchOperation]
+
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -140,4 +254,35 @@ class DashboardStats(BaseModel):
     total_clients: int
     total_appointments: int
     today_appointments: int
-    upcoming_appointments: int
\ No newline at end of file
+    upcoming_appointments: int
+
+# Metrics schemas
+class DbPoolStats(BaseModel):
+    name: str
+    pool_class: Optional[str] = None
+    size: Optional[int] = None
+    checked_out: int
+    overflow: Optional[int] = None
+    checkouts: int
+    timeouts: int
+    connects: int
+    invalidations: int
+    checkout_wait_avg_ms: float
+    checkout_wait_max_ms: float
+
+
+class CacheStats(BaseModel):
+    name: str
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+
+
+class TelegramSendStats(BaseModel):
+    running: bool
+    queued: int
+    sent: int
+    retried: int
+    failed: int
+    dead_letters: int
@@ -0,0 +1,130 @@
+"""Свободные слоты для записи.
+
+Занятость владельца загружается одним запросом за весь диапазон
+и сливается в отсортированный список непересекающихся интервалов;
+каждый слот-кандидат проверяется двоичным поиском по нему, без
+запросов к базе на каждый слот.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..crud import async_crud
+from ..crud.crud import ServiceDurationError
+
+Interval = Tuple[datetime, datetime]
+
+
+def parse_working_hours(spec: str) -> Dict[int, Optional[Tuple[time, time]]]:
+    """Часы работы по дням недели (0 — понедельник).
+
+    Формат: семь значений через запятую с понедельника, «ЧЧ:ММ-ЧЧ:ММ»
+    или «-» для выходного: "09:00-18:00,...,10:00-16:00,-".
+    """
+    days = [part.strip() for part in spec.split(",")]
+    if len(days) != 7:
+        raise ValueError("WORKING_HOURS: нужно 7 значений, с понедельника по воскресенье")
+    hours = {}
+    for weekday, value in enumerate(days):
+        if value == "-":
+            hours[weekday] = None
+            continue
+        opens, closes = (time.fromisoformat(part.strip()) for part in value.split("-"))
+        if opens >= closes:
+            raise ValueError(f"WORKING_HOURS: некорректный интервал {value}")
+        hours[weekday] = (opens, closes)
+    return hours
+
+
+WORKING_HOURS = parse_working_hours(settings.working_hours)
+
+
+class BusyIndex:
+    """Занятые интервалы владельца: отсортированы и слиты, поиск за O(log n)"""
+
+    def __init__(self, intervals: Iterable[Interval]):
+        starts: List[datetime] = []
+        ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if starts and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """Не пересекается ли [start, end) ни с одним занятым интервалом"""
+        # Первый интервал, заканчивающийся позже start
+        i = bisect_right(self.ends, start)
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def busy_until(self, moment: datetime) -> Optional[datetime]:
+        """Конец занятого интервала, содержащего moment"""
+        i = bisect_right(self.ends, moment)
+        if i < len(self.starts) and self.starts[i] <= moment:
+            return self.ends[i]
+        return None
+
+
+def local_now() -> datetime:
+    """Текущее время бизнеса (записи хранятся в местном времени без зоны)"""
+    return datetime.now(ZoneInfo(settings.timezone)).replace(tzinfo=None)
+
+
+def free_slots(
+    busy: BusyIndex,
+    duration: timedelta,
+    date_from: date,
+    date_to: date,
+    now: Optional[datetime] = None,
+    step: timedelta = timedelta(minutes=settings.slot_step_minutes),
+    working_hours: Dict[int, Optional[Tuple[time, time]]] = WORKING_HOURS,
+) -> List[datetime]:
+    """Начала свободных слотов длиной duration с шагом step в [date_from, date_to]"""
+    now = now or local_now()
+    slots = []
+    day = date_from
+    while day <= date_to:
+        hours = working_hours[day.weekday()]
+        if hours:
+            day_start = datetime.combine(day, hours[0])
+            day_end = datetime.combine(day, hours[1])
+            candidate = day_start
+            if candidate < now:
+                # Первый слот после текущего момента, на сетке шага от открытия
+                candidate += step * -(-(now - day_start) // step)
+            while candidate + duration <= day_end:
+                if busy.is_free(candidate, candidate + duration):
+                    slots.append(candidate)
+                    candidate += step
+                else:
+                    # Перепрыгиваем занятый интервал сразу к ближайшему слоту после него
+                    blocked_until = busy.busy_until(candidate) or candidate + step
+                    candidate += max(step, step * -(-(blocked_until - candidate) // step))
+        day += timedelta(days=1)
+    return slots
+
+
+async def get_free_slots(
+    db: AsyncSession, owner_id: int, duration_minutes: Optional[int], date_from: date, date_to: date
+) -> List[datetime]:
+    """Свободные слоты владельца для услуги длительностью duration_minutes.
+
+    ServiceDurationError, если у услуги не задана длительность.
+    """
+    if duration_minutes is None:
+        raise ServiceDurationError()
+    range_start = datetime.combine(date_from, time.min)
+    range_end = datetime.combine(date_to + timedelta(days=1), time.min)
+    intervals = await async_crud.get_busy_intervals(db, owner_id, range_start, range_end)
+    return free_slots(BusyIndex(intervals), timedelta(minutes=duration_minutes), date_from, date_to)
+
@@ -0,0 +1,70 @@
+"""Фоновые сервисы: Telegram бот и рассылка напоминаний.
+
+Запускаются в веб-процессе (RUN_BACKGROUND_SERVICES=true, по умолчанию)
+или в отдельном воркере (python -m app.worker), чтобы HTTP-процессы
+можно было масштабировать независимо от бота и напоминаний.
+"""
+import asyncio
+import logging
+
+from ..core.config import settings
+from .telegram_bot import telegram_bot
+from .reminder_service import reminder_service
+
+logger = logging.getLogger(__name__)
+
+
+def check_webhook_settings():
+    """Без секрета эндпоинт webhook отклоняет все обновления (403), и бот молча
+    перестает отвечать — поэтому процесс с webhook без секрета не запускается"""
+    if not settings.telegram_webhook_secret:
+        raise RuntimeError("В режиме webhook задайте TELEGRAM_WEBHOOK_SECRET")
+
+
+async def start_background_services(serve_webhook: bool = False):
+    """Запустить Telegram бота и сервис напоминаний.
+
+    serve_webhook — процесс принимает обновления бота через HTTP
+    (веб-приложение); воркер в режиме webhook бота только для отправки.
+    """
+    if settings.telegram_bot_token and settings.telegram_webhook_url and serve_webhook:
+        check_webhook_settings()
+    if settings.telegram_bot_token:
+        try:
+            if settings.telegram_webhook_url:
+                telegram_bot.setup_bot(webhook=True)
+                if serve_webhook:
+                    await telegram_bot.start_webhook()
+                else:
+                    await telegram_bot.start_sending()
+            else:
+                telegram_bot.setup_bot()
+                # Запускаем бота в фоновом режиме
+                asyncio.create_task(telegram_bot.start_polling())
+            logger.info("Telegram бот запущен")
+        except Exception as e:
+            logger.error(f"Ошибка запуска Telegram бота: {e}")
+
+    try:
+        reminder_service.start()
+    except Exception as e:
+        logger.error(f"Ошибка запуска сервиса напоминаний: {e}")
+
+
+async def start_webhook_receiver():
+    """Только прием обновлений бота через webhook (веб-процесс без фоновых задач)"""
+    if not (settings.telegram_bot_token and settings.telegram_webhook_url):
+        return
+    check_webhook_settings()
+    try:
+        telegram_bot.setup_bot(webhook=True)
+        await telegram_bot.start_webhook()
+        logger.info("Telegram webhook запущен")
+    except Exception as e:
+        logger.error(f"Ошибка запуска Telegram webhook: {e}")
+
+
+async def stop_background_services():
+    """Остановить сервис напоминаний и бота"""
+    reminder_service.stop()
+    await telegram_bot.stop()
@@ -0,0 +1,230 @@
+"""Массовый импорт клиентов из CSV и XLSX.
+
+Файл читается потоково и обрабатывается пачками по
+settings.client_import_chunk_size строк: на пачку один запрос проверки
+телефонов (нормализованный phone IN (...)) и один многострочный INSERT. Ошибки в строках
+попадают в отчет и не прерывают импорт.
+
+Общая логика используется и API (POST /api/clients/import), и скриптом
+import_clients.py.
+"""
+import codecs
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..crud import async_crud, crud
+from ..schemas import schemas
+
+# Заголовки столбцов (в нижнем регистре) и поля клиента
+COLUMNS = {
+    "full_name": "full_name", "name": "full_name", "фио": "full_name", "имя": "full_name", "клиент": "full_name",
+    "phone": "phone", "телефон": "phone",
+    "email": "email", "e-mail": "email", "почта": "email",
+    "telegram_username": "telegram_username", "telegram": "telegram_username", "телеграм": "telegram_username",
+    "notes": "notes", "заметки": "notes", "примечание": "notes",
+}
+
+Row = Tuple[int, Dict[str, Optional[str]]]  # (номер строки в файле, значения)
+
+
+class ClientImportError(Exception):
+    """Файл нельзя импортировать целиком (формат, заголовок)"""
+
+
+def normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """Телефон в виде +<цифры>; российские 8XXXXXXXXXX и XXXXXXXXXX приводятся к +7.
+
+    None, если номер не похож на телефон. Записанные в базе телефоны
+    сравниваются в том же виде через models.CLIENT_PHONE_KEY — правила
+    должны совпадать.
+    """
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    digits = re.sub(r"\D", "", raw)
+    if not raw.startswith("+"):
+        if len(digits) == 11 and digits[0] == "8":
+            digits = "7" + digits[1:]
+        elif len(digits) == 10:
+            digits = "7" + digits
+    if not 10 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def _map_header(header) -> List[Optional[str]]:
+    fields = [COLUMNS.get(str(name or "").strip().lower()) for name in header]
+    missing = {"full_name", "phone"} - set(fields)
+    if missing:
+        raise ClientImportError(f"В заголовке нет столбцов: {', '.join(sorted(missing))}")
+    return fields
+
+
+def _rows(lines, first_line: int) -> Iterator[Row]:
+    header = next(lines, None)
+    if header is None:
+        raise ClientImportError("Файл пуст")
+    fields = _map_header(header)
+    for line_number, values in enumerate(lines, start=first_line):
+        if not any(value not in (None, "") for value in values):
+            continue
+        yield line_number, {
+            name: (str(value).strip() or None) if value is not None else None
+            for name, value in zip(fields, values) if name
+        }
+
+
+def read_rows(file: BinaryIO, filename: str) -> Iterator[Row]:
+    """Строки файла по мере чтения; формат по расширению (.csv или .xlsx)"""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ClientImportError("Для импорта XLSX установите openpyxl или загрузите CSV")
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from _rows(workbook.active.iter_rows(values_only=True), first_line=2)
+        finally:
+            workbook.close()
+    elif name.endswith(".csv") or not name:
+        text = io.TextIOWrapper(file, encoding=_csv_encoding(file), newline="")
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from _rows(csv.reader(text, dialect), first_line=2)
+    else:
+        raise ClientImportError("Поддерживаются файлы .csv и .xlsx")
+
+
+def _csv_encoding(file: BinaryIO) -> str:
+    """UTF-8 (с BOM или без) или cp1251 — так CSV сохраняет русский Excel"""
+    sample = file.read(4096)
+    file.seek(0)
+    try:
+        # Инкрементальный декодер не считает ошибкой символ, обрезанный концом образца
+        codecs.getincrementaldecoder("utf-8")().decode(sample)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1251"
+
+
+@dataclass
+class ClientImport:
+    """Состояние импорта: счетчики, ошибки и телефоны, уже встреченные в файле"""
+    owner_id: int
+    max_errors: int = settings.client_import_max_errors
+    total: int = 0
+    created: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: List[schemas.ClientImportRowError] = field(default_factory=list)
+    seen: Set[str] = field(default_factory=set)
+
+    def error(self, row: int, message: str, phone: Optional[str] = None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(schemas.ClientImportRowError(row=row, phone=phone, error=message))
+
+    def prepare(self, rows: List[Row]) -> List[Tuple[int, dict]]:
+        """Проверить и нормализовать пачку; дубликаты внутри файла отбрасываются"""
+        prepared = []
+        for line_number, values in rows:
+            self.total += 1
+            raw_phone = values.get("phone")
+            phone = normalize_phone(raw_phone)
+            if phone is None:
+                self.error(line_number, "Некорректный телефон", raw_phone)
+                continue
+            if not values.get("full_name"):
+                self.error(line_number, "Не указано имя", phone)
+                continue
+            try:
+                client = schemas.ClientCreate(**{**values, "phone": phone})
+            except ValidationError as e:
+                self.error(line_number, "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                ), phone)
+                continue
+            if phone in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(phone)
+            prepared.append((line_number, client.model_dump()))
+        return prepared
+
+    def existing(self, prepared: List[Tuple[int, dict]], owners: Dict[str, int]) -> List[Tuple[int, dict]]:
+        """Отбросить телефоны, которые уже есть в базе"""
+        fresh = []
+        for line_number, client in prepared:
+            owner_id = owners.get(client["phone"])
+            if owner_id is None:
+                fresh.append((line_number, client))
+            elif owner_id == self.owner_id:
+                self.duplicates += 1
+            else:
+                self.error(line_number, "Телефон уже используется", client["phone"])
+        return fresh
+
+    def inserted(self, fresh: List[Tuple[int, dict]], phones: List[str]):
+        inserted = set(phones)
+        self.created += len(inserted)
+        # Не вставленные — телефон успели занять параллельно
+        self.duplicates += sum(1 for _, client in fresh if client["phone"] not in inserted)
+
+    def report(self) -> schemas.ClientImportReport:
+        return schemas.ClientImportReport(
+            total=self.total, created=self.created, duplicates=self.duplicates,
+            failed=self.failed, errors=sorted(self.errors, key=lambda error: error.row)
+        )
+
+
+def chunks(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_clients(
+    db: Session, rows: Iterator[Row], owner_id: int, chunk_size: int = settings.client_import_chunk_size
+) -> schemas.ClientImportReport:
+    """Импорт через синхронную сессию (скрипт import_clients.py)"""
+    state = ClientImport(owner_id)
+    for chunk in chunks(rows, chunk_size):
+        prepared = state.prepare(chunk)
+        owners = crud.get_client_owners_by_phone(db, [client["phone"] for _, client in prepared])
+        fresh = state.existing(prepared, owners)
+        state.inserted(fresh, crud.insert_clients(db, [client for _, client in fresh], owner_id))
+    return state.report()
+
+
+async def import_clients_async(
+    db: AsyncSession, rows: Iterator[Row], owner_id: int, chunk_size: int = settings.client_import_chunk_size
+) -> schemas.ClientImportReport:
+    """Импорт через AsyncSession (API); чтение и разбор файла — в пуле потоков"""
+    state = ClientImport(owner_id)
+    pending = chunks(rows, chunk_size)
+    while True:
+        chunk = await run_in_threadpool(next, pending, None)
+        if chunk is None:
+            break
+        prepared = state.prepare(chunk)
+        owners = await async_crud.get_client_owners_by_phone(db, [client["phone"] for _, client in prepared])
+        fresh = state.existing(prepared, owners)
+        state.inserted(fresh, await async_crud.insert_clients(db, [client for _, client in fresh], owner_id))
+    return state.report()
@@ -1,82 +1,191 @@
 import asyncio
 import logging
-from datetime import datetime
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from ..core.database import SessionLocal
+from ..core.database import AsyncSessionLocal
 from ..core.config import settings
-from ..crud import crud
+from ..core.reminder_schedule import reminder_schedule
+from ..crud import async_crud
 from .telegram_bot import telegram_bot
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ReminderRunStats:
+    """Итоги одного прохода рассылки напоминаний"""
+    due: int = 0
+    sent: int = 0
+    failed: int = 0
+    no_telegram: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    duration: float = 0.0
+    failed_ids: List[int] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Отправлено напоминаний в секунду"""
+        return self.sent / self.duration if self.duration else 0.0
+
+
+def format_reminder(appointment) -> str:
+    """Текст напоминания о записи"""
+    date_str = appointment.datetime.strftime('%d.%m.%Y')
+    time_str = appointment.datetime.strftime('%H:%M')
+
+    return (
+        f"📅 Услуга: {appointment.service.name}\n"
+        f"📅 Дата: {date_str}\n"
+        f"🕐 Время: {time_str}\n\n"
+        f"💡 Если нужно отменить или перенести запись, "
+        f"обратитесь к администратору или воспользуйтесь ботом."
+    )
+
+
 class ReminderService:
+    """Напоминания о записях.
+
+    Моменты отправки хранятся в расписании core.reminder_schedule: crud
+    обновляет его при изменении записей, а таймер будит сервис к ближайшему
+    сроку. Раз в settings.reminder_reconcile_minutes расписание сверяется
+    с базой — так подхватываются изменения из других процессов и повторяются
+    неудавшиеся отправки.
+    """
+
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
-        
-    async def check_and_send_reminders(self):
-        """Проверить и отправить напоминания"""
+        # Имя процесса в reminder_claimed_by
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        self._timer: Optional[asyncio.Task] = None
+
+    async def check_and_send_reminders(self, appointment_ids: Optional[List[int]] = None) -> ReminderRunStats:
+        """Проверить и отправить напоминания.
+
+        Пачка записей сначала захватывается за этим процессом
+        (FOR UPDATE SKIP LOCKED), поэтому несколько воркеров не отправляют
+        одно напоминание дважды. Затем записи читаются вместе с клиентом
+        и услугой, отправляются с ограниченной параллельностью, а успешные
+        отмечаются одним UPDATE на пачку. appointment_ids ограничивает
+        проверку записями, сработавшими в расписании.
+        """
         logger.info("Проверка напоминаний...")
-        
-        with SessionLocal() as db:
-            # Получаем записи, для которых нужно отправить напоминания
-            appointments = crud.get_appointments_needing_reminders(
-                db, settings.reminder_hours_before
-            )
-            
-            for appointment in appointments:
-                if appointment.client.telegram_id:
-                    # Формируем текст напоминания
-                    service = crud.get_service(db, appointment.service_id)
-                    date_str = appointment.datetime.strftime('%d.%m.%Y')
-                    time_str = appointment.datetime.strftime('%H:%M')
-                    
-                    reminder_text = (
-                        f"📅 Услуга: {service.name}\n"
-                        f"📅 Дата: {date_str}\n"
-                        f"🕐 Время: {time_str}\n\n"
-                        f"💡 Если нужно отменить или перенести запись, "
-                        f"обратитесь к администратору или воспользуйтесь ботом."
-                    )
-                    
-                    # Отправляем напоминание
-                    success = await telegram_bot.send_reminder(
-                        appointment.client.telegram_id,
-                        reminder_text
-                    )
-                    
-                    if success:
-                        # Отмечаем, что напоминание отправлено
-                        crud.mark_reminder_sent(db, appointment.id)
-                        logger.info(f"Напоминание отправлено для записи {appointment.id}")
+        stats = ReminderRunStats()
+        semaphore = asyncio.Semaphore(settings.reminder_send_concurrency)
+
+        async def send(appointment) -> bool:
+            async with semaphore:
+                return await telegram_bot.send_reminder(
+                    appointment.client.telegram_id,
+                    format_reminder(appointment)
+                )
+
+        async with AsyncSessionLocal() as db:
+            while True:
+                claimed_ids = await async_crud.claim_reminders(
+                    db, self.worker_id, settings.reminder_hours_before,
+                    settings.reminder_batch_size, settings.reminder_claim_ttl_seconds, appointment_ids
+                )
+                if not claimed_ids:
+                    break
+                batch = await async_crud.get_appointments_needing_reminders(
+                    db, settings.reminder_hours_before, claimed_ids
+                )
+                stats.batches += 1
+                stats.due += len(batch)
+
+                deliverable = []
+                for appointment in batch:
+                    if appointment.client.telegram_id:
+                        deliverable.append(appointment)
                     else:
-                        logger.error(f"Не удалось отправить напоминание для записи {appointment.id}")
-                
-                else:
-                    logger.warning(f"У клиента {appointment.client.full_name} нет Telegram ID")
-    
+                        stats.no_telegram += 1
+
+                results = await asyncio.gather(
+                    *(send(appointment) for appointment in deliverable),
+                    return_exceptions=True
+                )
+
+                sent_ids = []
+                for appointment, result in zip(deliverable, results):
+                    if result is True:
+                        sent_ids.append(appointment.id)
+                    else:
+                        stats.failed += 1
+                        stats.failed_ids.append(appointment.id)
+                        logger.error(f"Не удалось отправить напоминание для записи {appointment.id}: {result}")
+
+                # Неотправленные остаются захваченными до истечения аренды:
+                # повтор будет не раньше чем через reminder_claim_ttl_seconds
+                await async_crud.mark_reminders_sent(db, sent_ids)
+                stats.sent += len(sent_ids)
+                if len(claimed_ids) < settings.reminder_batch_size:
+                    break
+
+        stats.duration = time.monotonic() - stats.started_at
+        logger.info(
+            f"Напоминания: к отправке {stats.due}, отправлено {stats.sent}, "
+            f"ошибок {stats.failed}, без Telegram {stats.no_telegram}, "
+            f"пачек {stats.batches}, {stats.duration:.2f} с ({stats.throughput:.1f}/с)"
+        )
+        return stats
+
+    async def reconcile(self):
+        """Сверить расписание с базой на ближайшее окно"""
+        until = datetime.utcnow() + timedelta(minutes=2 * settings.reminder_reconcile_minutes)
+        async with AsyncSessionLocal() as db:
+            appointments = await async_crud.get_reminder_schedule(db, settings.reminder_hours_before, until)
+        reminder_schedule.load(appointments, until)
+        logger.info(f"Расписание напоминаний сверено: {len(reminder_schedule)} в очереди")
+
+    async def run_timer(self):
+        """Отправлять напоминания по мере наступления сроков"""
+        while True:
+            await reminder_schedule.wait(max_seconds=60)
+            appointment_ids = reminder_schedule.pop_due(limit=settings.reminder_batch_size)
+            if not appointment_ids:
+                continue
+            try:
+                await self.check_and_send_reminders(appointment_ids)
+            except Exception as e:
+                logger.error(f"Ошибка отправки напоминаний: {e}")
+            finally:
+                reminder_schedule.done(appointment_ids)
+
     def start(self):
         """Запуск планировщика"""
-        # Проверяем напоминания каждые 30 минут
+        reminder_schedule.attach(asyncio.get_running_loop())
+        self._timer = asyncio.create_task(self.run_timer())
+
+        # Сверка запускается сразу (загрузка расписания) и затем периодически
         self.scheduler.add_job(
-            self.check_and_send_reminders,
-            trigger=IntervalTrigger(minutes=30),
-            id='reminder_check',
-            name='Проверка напоминаний',
+            self.reconcile,
+            trigger=IntervalTrigger(minutes=settings.reminder_reconcile_minutes),
+            next_run_time=datetime.now(),
+            id='reminder_reconcile',
+            name='Сверка расписания напоминаний',
             replace_existing=True
         )
-        
+
         self.scheduler.start()
         logger.info("Сервис напоминаний запущен")
-    
+
     def stop(self):
         """Остановка планировщика"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Сервис напоминаний остановлен")
 
 
 # Глобальный экземпляр сервиса
-reminder_service = ReminderService()
\ No newline at end of file
+reminder_service = ReminderService()
@@ -1,45 +1,91 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
 from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     CallbackQueryHandler, ContextTypes, filters
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.bot_cache import client_appointments_cache
 from ..core.config import settings
-from ..core.database import SessionLocal
-from ..crud import crud
+from ..core.database import BotSessionLocal
+from ..crud import async_crud
+from ..crud.crud import AppointmentOverlapError, ClientNotFoundError, forget_telegram_user
 from ..schemas import schemas
 from ..models.models import AppointmentStatus
+from . import availability
+from .telegram_sender import TelegramSendQueue
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Сессия базы текущего обработчика (см. TelegramBot.session)
+_handler_db: ContextVar[Optional[AsyncSession]] = ContextVar("handler_db", default=None)
+
 
 class TelegramBot:
     def __init__(self):
         self.application = None
+        # Все исходящие сообщения идут через очередь с лимитами Telegram
+        self.sender = TelegramSendQueue()
+        # Одновременно обрабатываемых обновлений из webhook
+        self.update_semaphore = asyncio.Semaphore(settings.telegram_webhook_concurrency)
+        self.webhook_running = False
+        # (etag каталога, клавиатура услуг)
+        self._services_keyboard = None
+
+    @asynccontextmanager
+    async def session(self):
+        """Сессия базы для обработчика из отдельного пула бота (BotSessionLocal)"""
+        async with BotSessionLocal() as db:
+            token = _handler_db.set(db)
+            try:
+                yield db
+            finally:
+                _handler_db.reset(token)
+
+    async def release_db(self):
+        """Вернуть соединение обработчика в пул, пока сообщение ждет в очереди отправки"""
+        db = _handler_db.get()
+        if db is not None:
+            await db.close()
+
+    async def reply(self, update: Update, text: str, **kwargs):
+        """Отправить сообщение в чат, из которого пришло обновление"""
+        await self.release_db()
+        return await self.sender.send_message(update.effective_chat.id, text, **kwargs)
+
+    async def answer(self, query, **kwargs):
+        """Ответить на нажатие кнопки (убрать индикатор загрузки у клиента)"""
+        return await self.sender.answer_callback_query(query.message.chat_id, query.id, **kwargs)
+
+    async def edit(self, query, text: str, **kwargs):
+        """Заменить текст сообщения с кнопками"""
+        await self.release_db()
+        return await self.sender.edit_message_text(
+            query.message.chat_id, query.message.message_id, text, **kwargs
+        )
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Команда /start"""
         user = update.effective_user
         
         # Сохраняем Telegram ID пользователя
-        with SessionLocal() as db:
-            # Ищем клиента по telegram username
-            client = None
-            if user.username:
-                client = db.query(crud.models.Client).filter(
-                    crud.models.Client.telegram_username == user.username
-                ).first()
+        async with self.session() as db:
+            # Уже привязанный клиент находится по Telegram ID, новый — по username
+            client = await async_crud.get_client_identity_by_telegram_id(db, str(user.id))
+            if not client and user.username:
+                client = await async_crud.get_client_identity_by_telegram_username(db, user.username)
             
             if client:
                 # Обновляем telegram_id если его не было
                 if not client.telegram_id:
-                    client.telegram_id = str(user.id)
-                    db.commit()
+                    await async_crud.set_client_telegram_id(db, client.id, str(user.id))
                 
                 keyboard = [
                     [InlineKeyboardButton("📅 Записаться", callback_data="book_appointment")],
@@ -48,14 +94,16 @@ class TelegramBot:
                 ]
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 
-                await update.message.reply_text(
+                await self.reply(
+                    update,
                     f"Привет, {client.full_name}! 👋\n\n"
                     "Я помогу вам управлять записями.\n"
                     "Выберите действие:",
                     reply_markup=reply_markup
                 )
             else:
-                await update.message.reply_text(
+                await self.reply(
+                    update,
                     "Добро пожаловать! 👋\n\n"
                     "Для работы с ботом вам необходимо быть зарегистрированным клиентом.\n"
                     "Обратитесь к администратору для регистрации."
@@ -64,79 +112,183 @@ class TelegramBot:
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка нажатий на кнопки"""
         query = update.callback_query
-        await query.answer()
+        await self.answer(query)
         
         user_id = str(query.from_user.id)
         
-        with SessionLocal() as db:
-            client = crud.get_client_by_telegram_id(db, user_id)
+        async with self.session() as db:
+            client = await async_crud.get_client_identity_by_telegram_id(db, user_id)
             
             if not client:
-                await query.edit_message_text("Вы не зарегистрированы в системе.")
+                await self.edit(query, "Вы не зарегистрированы в системе.")
                 return
             
-            if query.data == "book_appointment":
-                await self.show_services(query, db)
-            elif query.data == "my_appointments":
-                await self.show_my_appointments(query, db, client)
-            elif query.data == "contact_info":
-                await self.show_contact_info(query)
-            elif query.data.startswith("book_service_"):
-                service_id = int(query.data.split("_")[2])
-                await self.book_service(query, db, client, service_id)
-            elif query.data.startswith("cancel_appointment_"):
-                appointment_id = int(query.data.split("_")[2])
-                await self.cancel_appointment(query, db, client, appointment_id)
+            try:
+                await self.handle_button(query, db, client)
+            except ClientNotFoundError:
+                # Клиента из кеша уже нет в базе (удален через API): ищем заново
+                forget_telegram_user(user_id, query.from_user.username)
+                client = await async_crud.get_client_identity_by_telegram_id(db, user_id)
+                if not client:
+                    await self.edit(query, "Вы не зарегистрированы в системе.")
+                    return
+                await self.handle_button(query, db, client)
+    
+    async def handle_button(self, query, db: AsyncSession, client):
+        """Действие кнопки для найденного клиента"""
+        if query.data == "book_appointment":
+            await self.show_services(query, db)
+        elif query.data == "my_appointments":
+            await self.show_my_appointments(query, db, client)
+        elif query.data.startswith("my_appointments_"):
+            page = int(query.data.split("_")[2])
+            await self.show_my_appointments(query, db, client, page)
+        elif query.data == "contact_info":
+            await self.show_contact_info(query)
+        elif query.data.startswith("book_service_"):
+            service_id = int(query.data.split("_")[2])
+            await self.book_service(query, db, client, service_id)
+        elif query.data.startswith("book_day_"):
+            _, _, service_id, day = query.data.split("_")
+            await self.show_day_slots(
+                query, db, client, int(service_id), datetime.strptime(day, "%Y%m%d").date()
+            )
+        elif query.data.startswith("book_slot_"):
+            _, _, service_id, slot = query.data.split("_")
+            await self.book_slot(query, db, client, int(service_id), datetime.strptime(slot, "%Y%m%d%H%M"))
+        elif query.data.startswith("cancel_appointment_"):
+            appointment_id = int(query.data.split("_")[2])
+            await self.cancel_appointment(query, db, client, appointment_id)
+    
+    def services_keyboard(self, catalog) -> InlineKeyboardMarkup:
+        """Клавиатура услуг; строится один раз на версию каталога"""
+        if self._services_keyboard is None or self._services_keyboard[0] != catalog.etag:
+            keyboard = []
+            for service in catalog.services:
+                if service.duration_minutes is None:
+                    continue  # Без длительности не построить слоты
+                price_text = f" - {service.price // 100} руб." if service.price else ""
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"{service.name} ({service.duration_minutes} мин){price_text}",
+                        callback_data=f"book_service_{service.id}"
+                    )
+                ])
+            
+            keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_menu")])
+            self._services_keyboard = (catalog.etag, InlineKeyboardMarkup(keyboard))
+        return self._services_keyboard[1]
     
-    async def show_services(self, query, db: Session):
+    async def show_services(self, query, db: AsyncSession):
         """Показать доступные услуги"""
-        services = crud.get_services(db)
+        catalog = await async_crud.get_service_catalog(db)
         
-        if not services:
-            await query.edit_message_text("На данный момент услуги недоступны.")
+        if not any(service.duration_minutes is not None for service in catalog.services):
+            await self.edit(query, "На данный момент услуги недоступны.")
             return
         
-        keyboard = []
-        for service in services:
-            price_text = f" - {service.price // 100} руб." if service.price else ""
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{service.name} ({service.duration_minutes} мин){price_text}",
-                    callback_data=f"book_service_{service.id}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_menu")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
+        await self.edit(
+            query,
             "Выберите услугу для записи:",
-            reply_markup=reply_markup
+            reply_markup=self.services_keyboard(catalog)
         )
     
-    async def book_service(self, query, db: Session, client, service_id: int):
-        """Записаться на услугу"""
-        service = crud.get_service(db, service_id)
+    async def _bookable_service(self, query, db: AsyncSession, service_id: int):
+        """Активная услуга с длительностью из каталога или сообщение, что записаться нельзя"""
+        catalog = await async_crud.get_service_catalog(db)
+        service = catalog.by_id.get(service_id)
+        if not service or not service.is_active:
+            await self.edit(query, "Услуга не найдена.")
+            return None
+        if service.duration_minutes is None:
+            await self.edit(query, "На эту услугу пока нельзя записаться.")
+            return None
+        return service
+    
+    async def book_service(self, query, db: AsyncSession, client, service_id: int):
+        """Записаться на услугу: выбор дня со свободным временем"""
+        service = await self._bookable_service(query, db, service_id)
+        if not service:
+            return
+        
+        today = availability.local_now().date()
+        slots = await availability.get_free_slots(
+            db, client.owner_id, service.duration_minutes,
+            today, today + timedelta(days=settings.telegram_booking_days - 1)
+        )
+        days = sorted({slot.date() for slot in slots})
+        
+        keyboard = [
+            [InlineKeyboardButton(
+                day.strftime('%d.%m.%Y'), callback_data=f"book_day_{service_id}_{day.strftime('%Y%m%d')}"
+            )]
+            for day in days
+        ]
+        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="book_appointment")])
+        
+        if days:
+            text = f"📅 {service.name}\n\nВыберите день:"
+        else:
+            text = f"😔 На ближайшие {settings.telegram_booking_days} дней свободного времени нет."
+        await self.edit(query, text, reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def show_day_slots(self, query, db: AsyncSession, client, service_id: int, day: date):
+        """Свободное время услуги в выбранный день"""
+        service = await self._bookable_service(query, db, service_id)
+        if not service:
+            return
         
+        slots = await availability.get_free_slots(db, client.owner_id, service.duration_minutes, day, day)
+        buttons = [
+            InlineKeyboardButton(
+                slot.strftime('%H:%M'), callback_data=f"book_slot_{service_id}_{slot.strftime('%Y%m%d%H%M')}"
+            )
+            for slot in slots
+        ]
+        keyboard = [buttons[i:i + 4] for i in range(0, len(buttons), 4)]
+        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data=f"book_service_{service_id}")])
+        
+        if slots:
+            text = f"🕐 {service.name}, {day.strftime('%d.%m.%Y')}\n\nВыберите время:"
+        else:
+            text = "😔 На этот день свободного времени уже нет."
+        await self.edit(query, text, reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def book_slot(self, query, db: AsyncSession, client, service_id: int, slot: datetime):
+        """Записать на выбранное время, если оно все еще свободно"""
+        service = await self._bookable_service(query, db, service_id)
         if not service:
-            await query.edit_message_text("Услуга не найдена.")
             return
         
-        # Здесь можно добавить логику выбора времени
-        # Для простоты создаем запись на завтра в 10:00
-        tomorrow = datetime.now() + timedelta(days=1)
-        appointment_time = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+        slot_taken_keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(
+            "🕐 Выбрать другое время",
+            callback_data=f"book_day_{service_id}_{slot.strftime('%Y%m%d')}"
+        )]])
+        
+        # Время могли занять, пока клиент выбирал; заодно проверяем часы работы
+        slots = await availability.get_free_slots(
+            db, client.owner_id, service.duration_minutes, slot.date(), slot.date()
+        )
+        if slot not in slots:
+            await self.edit(query, "😔 Это время уже занято.", reply_markup=slot_taken_keyboard)
+            return
         
         appointment_data = schemas.AppointmentCreate(
-            datetime=appointment_time,
+            datetime=slot,
             client_id=client.id,
             service_id=service_id,
             notes="Запись через Telegram бота"
         )
         
-        appointment = crud.create_appointment(db, appointment_data, client.owner_id)
+        try:
+            appointment = await async_crud.create_appointment(db, appointment_data, client.owner_id)
+        except AppointmentOverlapError:
+            # Слот заняли между проверкой и записью — это отсекает ограничение в базе
+            await self.edit(query, "😔 Это время уже занято.", reply_markup=slot_taken_keyboard)
+            return
         
-        await query.edit_message_text(
+        await self.edit(
+            query,
             f"✅ Вы успешно записаны!\n\n"
             f"Услуга: {service.name}\n"
             f"Дата: {appointment.datetime.strftime('%d.%m.%Y')}\n"
@@ -144,70 +296,84 @@ class TelegramBot:
             f"Мы напомним вам о записи заранее."
         )
     
-    async def show_my_appointments(self, query, db: Session, client):
-        """Показать записи клиента"""
-        now = datetime.now()
-        appointments = db.query(crud.models.Appointment).filter(
-            crud.models.Appointment.client_id == client.id,
-            crud.models.Appointment.datetime > now,
-            crud.models.Appointment.status.in_([
-                AppointmentStatus.SCHEDULED, 
-                AppointmentStatus.CONFIRMED
-            ])
-        ).order_by(crud.models.Appointment.datetime).all()
-        
-        if not appointments:
-            await query.edit_message_text("У вас нет предстоящих записей.")
-            return
-        
-        text = "📋 Ваши записи:\n\n"
+    def render_my_appointments(self, rows, page: int, has_next: bool):
+        """Текст и клавиатура страницы «Мои записи»"""
+        lines = ["📋 Ваши записи:", ""]
         keyboard = []
         
-        for appointment in appointments:
-            service = crud.get_service(db, appointment.service_id)
-            date_str = appointment.datetime.strftime('%d.%m.%Y %H:%M')
-            status_emoji = "📅" if appointment.status == AppointmentStatus.SCHEDULED else "✅"
+        for row in rows:
+            date_str = row.datetime.strftime('%d.%m.%Y %H:%M')
+            status_emoji = "📅" if row.status == AppointmentStatus.SCHEDULED else "✅"
             
-            text += f"{status_emoji} {service.name}\n"
-            text += f"   📅 {date_str}\n"
-            if appointment.notes:
-                text += f"   📝 {appointment.notes}\n"
-            text += "\n"
+            lines.append(f"{status_emoji} {row.service_name}")
+            lines.append(f"   📅 {date_str}")
+            if row.notes:
+                lines.append(f"   📝 {row.notes}")
+            lines.append("")
             
             keyboard.append([
                 InlineKeyboardButton(
                     f"❌ Отменить {date_str}",
-                    callback_data=f"cancel_appointment_{appointment.id}"
+                    callback_data=f"cancel_appointment_{row.id}"
                 )
             ])
         
+        navigation = []
+        if page > 0:
+            navigation.append(InlineKeyboardButton("⬅️ Предыдущие", callback_data=f"my_appointments_{page - 1}"))
+        if has_next:
+            navigation.append(InlineKeyboardButton("Следующие ➡️", callback_data=f"my_appointments_{page + 1}"))
+        if navigation:
+            keyboard.append(navigation)
         keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_menu")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await query.edit_message_text(text, reply_markup=reply_markup)
+        return "\n".join(lines), InlineKeyboardMarkup(keyboard)
     
-    async def cancel_appointment(self, query, db: Session, client, appointment_id: int):
+    async def show_my_appointments(self, query, db: AsyncSession, client, page: int = 0):
+        """Показать записи клиента (постранично, из кеша до записи или отмены)"""
+        pages = client_appointments_cache.get(client.id)
+        view = pages.get(page) if pages else None
+        
+        if view is None:
+            page_size = settings.telegram_appointments_page_size
+            rows = await async_crud.get_client_upcoming_appointments_page(
+                db, client.id, skip=page * page_size, limit=page_size
+            )
+            if not rows and page == 0:
+                if not await async_crud.client_exists(db, client.id):
+                    raise ClientNotFoundError()
+                view = ("У вас нет предстоящих записей.", None)
+            elif not rows:
+                # Записи на этой странице уже прошли или отменены — начинаем сначала
+                return await self.show_my_appointments(query, db, client)
+            else:
+                view = self.render_my_appointments(rows[:page_size], page, len(rows) > page_size)
+            pages = client_appointments_cache.get(client.id) or {}
+            client_appointments_cache.set(client.id, {**pages, page: view})
+        
+        text, reply_markup = view
+        await self.edit(query, text, reply_markup=reply_markup)
+    
+    async def cancel_appointment(self, query, db: AsyncSession, client, appointment_id: int):
         """Отменить запись"""
-        appointment = db.query(crud.models.Appointment).filter(
-            crud.models.Appointment.id == appointment_id,
-            crud.models.Appointment.client_id == client.id
-        ).first()
+        appointment = await async_crud.cancel_client_appointment(db, appointment_id, client.id)
         
         if not appointment:
-            await query.edit_message_text("Запись не найдена.")
+            if not await async_crud.client_exists(db, client.id):
+                raise ClientNotFoundError()
+            await self.edit(query, "Запись не найдена.")
             return
         
-        appointment.status = AppointmentStatus.CANCELLED
-        db.commit()
-        
-        await query.edit_message_text(
+        await self.edit(
+            query,
             "❌ Запись отменена.\n\n"
             "Если хотите записаться на другое время, воспользуйтесь командой /start"
         )
     
     async def show_contact_info(self, query):
         """Показать контактную информацию"""
-        await query.edit_message_text(
+        await self.edit(
+            query,
             "📞 Контактная информация:\n\n"
             "Телефон: +7 (XXX) XXX-XX-XX\n"
             "Email: info@example.com\n"
@@ -220,26 +386,29 @@ class TelegramBot:
     
     async def send_reminder(self, chat_id: str, appointment_text: str):
         """Отправить напоминание о записи"""
-        if not self.application:
+        if not self.sender.running:
             return False
         
         try:
-            await self.application.bot.send_message(
-                chat_id=int(chat_id),
-                text=f"🔔 Напоминание о записи!\n\n{appointment_text}"
+            await self.sender.send_message(
+                int(chat_id),
+                f"🔔 Напоминание о записи!\n\n{appointment_text}"
             )
             return True
         except Exception as e:
             logger.error(f"Ошибка отправки напоминания: {e}")
             return False
     
-    def setup_bot(self):
-        """Настройка бота"""
+    def setup_bot(self, webhook: bool = False):
+        """Настройка бота; в режиме webhook обновления не опрашиваются (без Updater)"""
         if not settings.telegram_bot_token:
             logger.warning("Telegram bot token не установлен")
             return None
         
-        self.application = Application.builder().token(settings.telegram_bot_token).build()
+        builder = Application.builder().token(settings.telegram_bot_token)
+        if webhook:
+            builder = builder.updater(None)
+        self.application = builder.build()
         
         # Добавляем обработчики
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -251,9 +420,55 @@ class TelegramBot:
         """Запуск бота"""
         if self.application:
             await self.application.initialize()
+            self.sender.start(self.application.bot)
             await self.application.start()
             await self.application.updater.start_polling()
 
+    async def start_sending(self):
+        """Запуск без получения обновлений: только отправка (напоминания).
+
+        Используется воркером в режиме webhook — обновления принимает веб-процесс.
+        """
+        if self.application:
+            await self.application.initialize()
+            self.sender.start(self.application.bot)
+
+    async def start_webhook(self):
+        """Запуск в режиме webhook: обновления приходят на /api/telegram/webhook"""
+        if not self.application:
+            return
+        await self.application.initialize()
+        self.sender.start(self.application.bot)
+        await self.application.start()
+        # setWebhook вызываем, только если адрес изменился: процессов API может быть несколько
+        info = await self.application.bot.get_webhook_info()
+        if info.url != settings.telegram_webhook_url:
+            await self.application.bot.set_webhook(
+                settings.telegram_webhook_url,
+                secret_token=settings.telegram_webhook_secret,
+                max_connections=settings.telegram_webhook_max_connections,
+                allowed_updates=["message", "callback_query"]
+            )
+        self.webhook_running = True
+
+    async def process_update(self, data: dict):
+        """Обработать обновление из webhook (JSON от Telegram)"""
+        update = Update.de_json(data, self.application.bot)
+        async with self.update_semaphore:
+            await self.application.process_update(update)
+
+    async def stop(self):
+        """Остановка бота: дослать очередь сообщений и закрыть соединения"""
+        if not self.application:
+            return
+        self.webhook_running = False
+        if self.application.updater and self.application.updater.running:
+            await self.application.updater.stop()
+        if self.application.running:
+            await self.application.stop()
+        await self.sender.stop()
+        await self.application.shutdown()
+
 
 # Глобальный экземпляр бота
 telegram_bot = TelegramBot()
\ No newline at end of file
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Методы Bot API без параметра chat_id. Ответ на нажатие кнопки не отправляет
+# сообщение в чат, поэтому на него действует только общий лимит
+CHATLESS_METHODS = {"answer_callback_query"}
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не более capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self) -> float:
+        """Сколько секунд ждать токен; 0 — токен взят"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, seconds: float):
+        """Не выдавать токены seconds секунд (ответ RetryAfter от Telegram)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass
+class DeadLetter:
+    chat_id: int
+    method: str
+    kwargs: Dict[str, Any]
+    error: str
+    attempts: int
+    failed_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class _Job:
+    chat_id: int
+    method: str
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    attempts: int = 0
+
+
+class TelegramSendQueue:
+    """Очередь исходящих вызовов Bot API с ограничением частоты и повторами.
+
+    Все вызовы бота (напоминания, ответы и ответы на нажатия кнопок)
+    проходят через общую очередь:
+    - общий и по-чатовый token bucket держат частоту в лимитах Telegram;
+    - на RetryAfter чат (и бот целиком) ждет указанное время и вызов повторяется;
+    - сетевые ошибки повторяются с экспоненциальной задержкой;
+    - вызовы, которые не удалось выполнить, попадают в dead_letters.
+
+    Бот передается в start(), поэтому очередь проверяется с фейковым ботом.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = settings.telegram_global_rate,
+        per_chat_rate: float = settings.telegram_per_chat_rate,
+        per_chat_burst: int = settings.telegram_per_chat_burst,
+        workers: int = settings.telegram_send_workers,
+        max_retries: int = settings.telegram_send_max_retries,
+        backoff_base: float = settings.telegram_send_backoff_base,
+        backoff_max: float = settings.telegram_send_backoff_max,
+        dead_letter_size: int = 1000,
+        max_chats: int = 10000,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_chats = max_chats
+        self.dead_letters: Deque[DeadLetter] = deque(maxlen=dead_letter_size)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.bot = None
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._futures = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self, bot):
+        """Запустить обработчики очереди для бота (telegram.Bot или фейк)"""
+        if self.running:
+            return
+        self.bot = bot
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Дождаться отправки очереди (не дольше timeout) и остановить обработчики"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Telegram: не отправлено {self._queue.qsize()} сообщений при остановке")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Вызовы, ожидающие повтора, завершаем ошибкой, чтобы никто не ждал вечно
+        for future in list(self._futures):
+            if not future.done():
+                future.set_exception(RuntimeError("Очередь отправки Telegram остановлена"))
+        self._futures.clear()
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        return await self.call("send_message", chat_id, text=text, **kwargs)
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs):
+        return await self.call("edit_message_text", chat_id, message_id=message_id, text=text, **kwargs)
+
+    async def answer_callback_query(self, chat_id: int, callback_query_id: str, **kwargs):
+        """Ответ на нажатие кнопки; chat_id — чат сообщения с кнопкой (для статистики и ошибок)"""
+        return await self.call("answer_callback_query", chat_id, callback_query_id=callback_query_id, **kwargs)
+
+    async def call(self, method: str, chat_id: int, **kwargs):
+        """Поставить вызов bot.<method>(chat_id=..., **kwargs) в очередь и дождаться результата"""
+        if not self.running:
+            raise RuntimeError("Очередь отправки Telegram не запущена")
+        future = asyncio.get_running_loop().create_future()
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        self._queue.put_nowait(_Job(chat_id, method, kwargs, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dead_letters": len(self.dead_letters),
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def _acquire(self, job: _Job):
+        chat_bucket = None if job.method in CHATLESS_METHODS else self._chat_bucket(job.chat_id)
+        while True:
+            if chat_bucket:
+                wait = chat_bucket.delay()
+                if wait:
+                    await asyncio.sleep(wait)
+                    continue
+            wait = self.global_bucket.delay()
+            if not wait:
+                return
+            # Токен чата уже взят — возвращаем его, пока ждем общий лимит
+            if chat_bucket:
+                chat_bucket.tokens += 1
+            await asyncio.sleep(wait)
+
+    def _request(self, job: _Job):
+        if job.method in CHATLESS_METHODS:
+            return getattr(self.bot, job.method)(**job.kwargs)
+        return getattr(self.bot, job.method)(chat_id=job.chat_id, **job.kwargs)
+
+    def _retry_later(self, job: _Job, delay: float):
+        self.retried += 1
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
+
+    def _dead_letter(self, job: _Job, error: Exception):
+        self.failed += 1
+        self.dead_letters.append(DeadLetter(job.chat_id, job.method, job.kwargs, repr(error), job.attempts))
+        logger.error(f"Telegram: {job.method} в чат {job.chat_id} не выполнен после {job.attempts} попыток: {error}")
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.done():
+                    continue
+                await self._acquire(job)
+                job.attempts += 1
+                try:
+                    result = await self._request(job)
+                except RetryAfter as e:
+                    retry_after = float(e.retry_after)
+                    self._chat_bucket(job.chat_id).block(retry_after)
+                    self.global_bucket.block(retry_after)
+                    if job.attempts > self.max_retries:
+                        self._dead_letter(job, e)
+                    else:
+                        self._retry_later(job, retry_after)
+                except BadRequest as e:
+                    # Ошибка в самом запросе — повтор не поможет
+                    self._dead_letter(job, e)
+                except NetworkError as e:
+                    if job.attempts > self.max_retries:
+                        self._dead_letter(job, e)
+                    else:
+                        delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+                        self._retry_later(job, delay * random.uniform(0.5, 1.0))
+                except Exception as e:
+                    self._dead_letter(job, e)
+                else:
+                    self.sent += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            finally:
+                self._queue.task_done()
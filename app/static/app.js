@@ -1,6 +1,7 @@
 // Глобальные переменные
 let currentUser = null;
 let authToken = localStorage.getItem('authToken');
+let refreshToken = localStorage.getItem('refreshToken');
 
 // API базовый URL
 const API_BASE = '/api';
@@ -9,9 +10,10 @@ const API_BASE = '/api';
 class ApiClient {
     constructor(baseUrl) {
         this.baseUrl = baseUrl;
+        this.refreshing = null;
     }
 
-    async request(endpoint, options = {}) {
+    async request(endpoint, options = {}, retry = true) {
         const url = `${this.baseUrl}${endpoint}`;
         const headers = {
             'Content-Type': 'application/json',
@@ -31,6 +33,10 @@ class ApiClient {
             const response = await fetch(url, config);
             
             if (response.status === 401) {
+                // Access-токен истек: пробуем обновить его без повторного входа
+                if (retry && await this.refresh()) {
+                    return this.request(endpoint, options, false);
+                }
                 this.logout();
                 return;
             }
@@ -72,10 +78,51 @@ class ApiClient {
         });
     }
 
+    async refresh() {
+        // Одновременные 401 вкладки используют один запрос на обновление
+        if (!this.refreshing) {
+            this.refreshing = this.withTokenLock(() => this.refreshTokens()).finally(() => {
+                this.refreshing = null;
+            });
+        }
+        return this.refreshing;
+    }
+
+    // Вкладки обновляют токены по очереди: refresh-токен одноразовый,
+    // повторная отправка старого сервер считает кражей и отзывает всю семью
+    withTokenLock(callback) {
+        return navigator.locks ? navigator.locks.request('crm-token-refresh', callback) : callback();
+    }
+
+    async refreshTokens() {
+        // Токены в localStorage общие: другая вкладка могла уже обновить их или выйти
+        const stored = localStorage.getItem('refreshToken');
+        if (stored !== refreshToken) {
+            authToken = localStorage.getItem('authToken');
+            refreshToken = stored;
+            return Boolean(stored);
+        }
+        if (!refreshToken) {
+            return false;
+        }
+        try {
+            const response = await fetch(`${this.baseUrl}/auth/refresh`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({refresh_token: refreshToken})
+            });
+            if (!response.ok) {
+                return false;
+            }
+            saveTokens(await response.json());
+            return true;
+        } catch (error) {
+            return false;
+        }
+    }
+
     logout() {
-        localStorage.removeItem('authToken');
-        authToken = null;
-        window.location.href = '/login';
+        logout();
     }
 }
 
@@ -152,8 +199,7 @@ async function login(email, password) {
             password: password
         });
         
-        authToken = response.access_token;
-        localStorage.setItem('authToken', authToken);
+        saveTokens(response);
         
         showAlert('Вход выполнен успешно!', 'success');
         window.location.href = '/dashboard';
@@ -172,9 +218,29 @@ async function register(userData) {
     }
 }
 
+function saveTokens(tokens) {
+    authToken = tokens.access_token;
+    localStorage.setItem('authToken', authToken);
+    if (tokens.refresh_token) {
+        refreshToken = tokens.refresh_token;
+        localStorage.setItem('refreshToken', refreshToken);
+    }
+}
+
 function logout() {
+    if (refreshToken) {
+        // Отзываем refresh-токен на сервере, не дожидаясь ответа
+        fetch(`${API_BASE}/auth/logout`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({refresh_token: refreshToken}),
+            keepalive: true
+        }).catch(() => {});
+    }
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     authToken = null;
+    refreshToken = null;
     window.location.href = '/login';
 }
 
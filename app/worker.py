@@ -0,0 +1,36 @@
+"""Воркер фоновых задач: Telegram бот и напоминания без HTTP API.
+
+Запуск: python -m app.worker
+Веб-процессы в этом случае запускаются с RUN_BACKGROUND_SERVICES=false.
+"""
+import asyncio
+import logging
+import signal
+
+from .core.database import async_engine, bot_engine
+from .core.schema import check_schema_revision
+from .services.background import start_background_services, stop_background_services
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Запуск воркера...")
+    await check_schema_revision()
+    await start_background_services()
+    await stop.wait()
+
+    logger.info("Остановка воркера...")
+    await stop_background_services()
+    await async_engine.dispose()
+    await bot_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Массовый импорт клиентов из CSV или XLSX
+
+Клиенты добавляются пользователю с указанным email. Строки с ошибками
+и телефоны, которые уже есть в базе, пропускаются и выводятся в отчете.
+
+Запуск:
+    python import_clients.py clients.csv --owner admin@example.com
+"""
+
+import argparse
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.crud import crud
+from app.services.client_import import ClientImportError, import_clients, read_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт клиентов из CSV или XLSX")
+    parser.add_argument("path", help="Файл .csv или .xlsx; первая строка — заголовок")
+    parser.add_argument("--owner", required=True, help="Email пользователя, которому добавить клиентов")
+    parser.add_argument("--chunk-size", type=int, default=settings.client_import_chunk_size)
+    args = parser.parse_args()
+
+    db = Session(bind=engine)
+    try:
+        owner = crud.get_user_by_email(db, args.owner)
+        if owner is None:
+            print(f"Пользователь {args.owner} не найден")
+            sys.exit(1)
+
+        with open(args.path, "rb") as file:
+            try:
+                report = import_clients(db, read_rows(file, args.path), owner.id, args.chunk_size)
+            except ClientImportError as e:
+                print(f"Ошибка: {e}")
+                sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"Строк: {report.total}")
+    print(f"Добавлено: {report.created}")
+    print(f"Уже есть: {report.duplicates}")
+    print(f"С ошибками: {report.failed}")
+    for error in report.errors:
+        print(f"  строка {error.row}: {error.error}" + (f" ({error.phone})" if error.phone else ""))
+    if report.failed > len(report.errors):
+        print(f"  ... и еще {report.failed - len(report.errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,34 @@
 Создает таблицы и добавляет базовые данные
 """
 
-import asyncio
+from alembic import command
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from app.core.database import engine, Base
+from app.core.database import engine
+from app.core.schema import alembic_config
 from app.core.config import settings
 from app.crud import crud
 from app.schemas import schemas
 
 
+def run_migrations():
+    """Применить миграции Alembic до последней версии.
+
+    База, которую создал Base.metadata.create_all до появления миграций,
+    уже содержит исходную схему: она отмечается ревизией 0001 без ее выполнения.
+    """
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+
 def init_database():
     """Инициализация базы данных"""
-    print("Создание таблиц...")
-    Base.metadata.create_all(bind=engine)
-    print("Таблицы созданы!")
+    print("Применение миграций...")
+    run_migrations()
+    print("Схема базы данных актуальна!")
     
     # Создаем сессию
     db = Session(bind=engine)
@@ -27,18 +27,10 @@ if [ ! -f .env ]; then
     exit 1
 fi
 
-# Запускаем контейнеры
+# Запускаем контейнеры; миграции и базовые данные применяет сервис migrate
 echo "🐳 Запуск Docker контейнеров..."
 docker-compose up -d
 
-# Ждем запуска базы данных
-echo "⏳ Ожидание запуска базы данных..."
-sleep 10
-
-# Инициализируем базу данных
-echo "🗄️  Инициализация базы данных..."
-docker-compose exec -T app python init_db.py
-
 echo ""
 echo "🎉 CRM система запущена!"
 echo ""
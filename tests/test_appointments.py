@@ -0,0 +1,163 @@
+"""Записи: ошибки crud в ответах API и расчет конца записи"""
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app.core.auth import get_current_user
+from app.core.database import SessionLocal
+from app.crud import async_crud, crud
+from app.crud.crud import AppointmentOverlapError
+from app.main import app
+from app.models import models
+from app.schemas import schemas
+
+pytestmark = pytest.mark.anyio
+
+SLOT = datetime.combine(datetime.now().date() + timedelta(days=1), time(10, 0))
+
+
+def user() -> schemas.User:
+    return schemas.User(
+        id=1, email="user@example.com", full_name="Пользователь",
+        is_active=True, is_admin=False, created_at="2026-01-01T00:00:00"
+    )
+
+
+async def overlap(*args, **kwargs):
+    raise AppointmentOverlapError()
+
+
+async def found(*args, **kwargs):
+    return object()
+
+
+async def test_overlap_is_conflict(api, monkeypatch):
+    app.dependency_overrides[get_current_user] = user
+    monkeypatch.setattr(async_crud, "get_client", found)
+    monkeypatch.setattr(async_crud, "get_service", found)
+    monkeypatch.setattr(async_crud, "create_appointment", overlap)
+    monkeypatch.setattr(async_crud, "update_appointment", overlap)
+
+    body = {"datetime": SLOT.isoformat(), "client_id": 1, "service_id": 1}
+    response = await api.post("/api/appointments/", json=body)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Время пересекается с другой записью"
+
+    response = await api.put("/api/appointments/1", json={"datetime": SLOT.isoformat()})
+    assert response.status_code == 409
+
+
+async def test_update_rejects_null_datetime(api):
+    app.dependency_overrides[get_current_user] = user
+    response = await api.put("/api/appointments/1", json={"datetime": None})
+    assert response.status_code == 422
+
+    batch = {"operations": [{"op": "update", "id": 1, "data": {"datetime": None}}]}
+    response = await api.post("/api/appointments/batch", json=batch)
+    assert response.status_code == 422
+
+
+@pytest.fixture
+def schedule(owner):
+    """Клиент и услуги: 45 минут, без длительности"""
+    user, headers = owner
+    with SessionLocal() as db:
+        client = models.Client(full_name="Клиент", phone="+79000000001", owner_id=user.id)
+        timed = models.Service(name="Стрижка", duration_minutes=45)
+        untimed = models.Service(name="Консультация")
+        db.add_all([client, timed, untimed])
+        db.flush()
+        untimed.duration_minutes = None  # При вставке None заменился бы умолчанием столбца
+        db.commit()
+        return headers, user.id, client.id, timed.id, untimed.id
+
+
+def end_of(appointment_id: int) -> datetime:
+    with SessionLocal() as db:
+        return db.get(models.Appointment, appointment_id).end_datetime
+
+
+async def test_single_and_batch_compute_same_end(api, schedule):
+    headers, _, client_id, timed_id, _ = schedule
+    response = await api.post("/api/appointments/", headers=headers, json={
+        "datetime": SLOT.isoformat(), "client_id": client_id, "service_id": timed_id
+    })
+    single_id = response.json()["id"]
+
+    later = SLOT + timedelta(hours=2)
+    response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+        {"op": "create", "data": {"datetime": later.isoformat(), "client_id": client_id, "service_id": timed_id}},
+    ]})
+    (result,) = response.json()
+    assert result["status"] == 201
+    assert end_of(single_id) - SLOT == end_of(result["id"]) - later == timedelta(minutes=45)
+
+    # Перенос пересчитывает конец тем же способом
+    moved = SLOT + timedelta(hours=4)
+    response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+        {"op": "update", "id": single_id, "data": {"datetime": moved.isoformat()}},
+    ]})
+    assert response.json()[0]["status"] == 200
+    assert end_of(single_id) == moved + timedelta(minutes=45)
+
+
+async def test_unknown_service_or_duration_is_rejected(api, schedule):
+    headers, owner_id, client_id, timed_id, untimed_id = schedule
+    for service_id, status in [(untimed_id, 400), (untimed_id + 100, 404)]:
+        body = {"datetime": SLOT.isoformat(), "client_id": client_id, "service_id": service_id}
+        response = await api.post("/api/appointments/", headers=headers, json=body)
+        assert response.status_code == status, service_id
+
+        response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+            {"op": "create", "data": body},
+        ]})
+        assert response.json()[0]["status"] == status, service_id
+
+    # Услуга записи потеряла длительность: перенос не считает конец по нулю
+    with SessionLocal() as db:
+        appointment = models.Appointment(
+            datetime=SLOT, end_datetime=SLOT + timedelta(hours=1),
+            client_id=client_id, service_id=untimed_id, owner_id=owner_id
+        )
+        db.add(appointment)
+        db.commit()
+        appointment_id = appointment.id
+    moved = {"datetime": (SLOT + timedelta(days=1)).isoformat()}
+    response = await api.put(f"/api/appointments/{appointment_id}", headers=headers, json=moved)
+    assert response.status_code == 400
+    response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+        {"op": "update", "id": appointment_id, "data": moved},
+    ]})
+    assert response.json()[0]["status"] == 400
+    assert end_of(appointment_id) == SLOT + timedelta(hours=1)
+
+
+async def test_batch_client_deleted_before_insert_is_not_found(api, schedule, monkeypatch):
+    headers, owner_id, client_id, timed_id, _ = schedule
+    with SessionLocal() as db:
+        doomed = models.Client(full_name="Удаляемый", phone="+79000000002", owner_id=owner_id)
+        db.add(doomed)
+        db.commit()
+        doomed_id = doomed.id
+
+    owned_batch_targets = crud._owned_batch_targets
+
+    def delete_after_check(*args, **kwargs):
+        # Клиента удаляют в другой транзакции уже после проверки владельца
+        targets = owned_batch_targets(*args, **kwargs)
+        with SessionLocal() as other:
+            other.query(models.Client).filter(models.Client.id == doomed_id).delete()
+            other.commit()
+        return targets
+
+    monkeypatch.setattr(crud, "_owned_batch_targets", delete_after_check)
+    response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+        {"op": "create", "data": {"datetime": SLOT.isoformat(), "client_id": doomed_id, "service_id": timed_id}},
+        {"op": "create", "data": {
+            "datetime": (SLOT + timedelta(hours=2)).isoformat(), "client_id": client_id, "service_id": timed_id
+        }},
+    ]})
+    assert response.status_code == 200
+    assert [(result["status"], result["error"]) for result in response.json()] == [
+        (404, "Клиент не найден"), (201, None)
+    ]
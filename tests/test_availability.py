@@ -0,0 +1,86 @@
+"""Свободные слоты: сетка, занятость, текущее время и выходные"""
+import time as timer
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models import models
+from app.services.availability import BusyIndex, free_slots
+
+MONDAY = date(2026, 10, 19)
+HOURS = {weekday: (time(9, 0), time(12, 0)) for weekday in range(5)}
+HOURS.update({5: None, 6: None})
+HOUR = timedelta(hours=1)
+STEP = timedelta(minutes=30)
+BEFORE = datetime(2026, 10, 1)  # Момент до всех проверяемых дней
+
+
+def at(hour: int, minute: int = 0, day: date = MONDAY) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+def slots(busy=(), duration=HOUR, date_from=MONDAY, date_to=MONDAY, now=BEFORE):
+    return free_slots(BusyIndex(busy), duration, date_from, date_to, now=now, step=STEP, working_hours=HOURS)
+
+
+def test_slots_follow_grid_from_opening():
+    assert slots() == [at(9), at(9, 30), at(10), at(10, 30), at(11)]
+
+
+def test_busy_blocks_are_skipped():
+    # 9:40-10:10 задевает слоты 9:00, 9:30 и 10:00; первый свободный — 10:30, на сетке
+    assert slots([(at(9, 40), at(10, 10))]) == [at(10, 30), at(11)]
+    # Соседние и пересекающиеся интервалы сливаются
+    assert slots([(at(9), at(10)), (at(10), at(10, 30)), (at(10, 15), at(11))]) == [at(11)]
+    # Запись вплотную к слоту не мешает ему
+    assert slots([(at(10), at(11))]) == [at(9), at(11)]
+
+
+def test_now_mid_day_starts_at_next_grid_point():
+    assert slots(now=at(9, 10)) == [at(9, 30), at(10), at(10, 30), at(11)]
+    assert slots(now=at(10)) == [at(10), at(10, 30), at(11)]
+    assert slots(now=at(11, 1)) == []
+
+
+def test_closed_days_have_no_slots():
+    saturday, sunday = MONDAY + timedelta(days=5), MONDAY + timedelta(days=6)
+    assert slots(date_from=saturday, date_to=sunday) == []
+    week = slots(duration=3 * HOUR, date_to=sunday)
+    assert [slot.date() for slot in week] == [MONDAY + timedelta(days=i) for i in range(5)]
+
+
+def test_month_with_thousands_of_bookings_takes_milliseconds():
+    days = [MONDAY + timedelta(days=i) for i in range(31)]
+    starts = [at(9, day=day) + i * timedelta(minutes=3) for day in days for i in range(100)]
+    busy = [(start, start + timedelta(minutes=2)) for start in starts]
+    hours = {weekday: (time(9, 0), time(18, 0)) for weekday in range(7)}
+
+    started = timer.perf_counter()
+    result = free_slots(
+        BusyIndex(busy), timedelta(minutes=15), days[0], days[-1], now=BEFORE, step=STEP, working_hours=hours
+    )
+    elapsed = timer.perf_counter() - started
+
+    # Утро до 14:00 занято записями каждые 3 минуты, после — свободно
+    assert result[0] == at(14, 0)
+    assert len(result) == 31 * 8
+    assert elapsed < 0.05, elapsed
+
+
+@pytest.mark.anyio
+async def test_service_without_duration_is_bad_request(api, owner):
+    user, headers = owner
+    with SessionLocal() as db:
+        service = models.Service(name="Консультация")
+        db.add(service)
+        db.flush()
+        service.duration_minutes = None  # При вставке None заменился бы умолчанием столбца
+        db.commit()
+        service_id = service.id
+
+    response = await api.get(
+        f"/api/appointments/availability?service_id={service_id}&date_from={MONDAY.isoformat()}", headers=headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "У услуги не задана длительность"
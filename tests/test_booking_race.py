@@ -0,0 +1,75 @@
+"""Гонка параллельных записей на одно время: выигрывает ровно одна"""
+import asyncio
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models import models
+
+pytestmark = pytest.mark.anyio
+
+RACERS = 8
+SLOT = datetime.combine(datetime.now().date() + timedelta(days=1), time(10, 0))
+
+
+@pytest.fixture
+def racers(owner):
+    """Клиенты владельца и услуга на 60 минут"""
+    user, headers = owner
+    with SessionLocal() as db:
+        service = models.Service(name="Стрижка", duration_minutes=60)
+        clients = [
+            models.Client(full_name=f"Клиент {i}", phone=f"+7900000{i:04d}", owner_id=user.id)
+            for i in range(RACERS)
+        ]
+        db.add(service)
+        db.add_all(clients)
+        db.commit()
+        return headers, service.id, [client.id for client in clients]
+
+
+def booking(client_id: int, service_id: int, index: int) -> dict:
+    # Начала разные, но внутри длительности услуги — все записи пересекаются
+    start = SLOT + timedelta(minutes=5 * index)
+    return {"datetime": start.isoformat(), "client_id": client_id, "service_id": service_id}
+
+
+def appointment_count() -> int:
+    with SessionLocal() as db:
+        return db.query(models.Appointment).count()
+
+
+async def test_parallel_bookings_one_wins(api, racers):
+    headers, service_id, client_ids = racers
+    responses = await asyncio.gather(*(
+        api.post("/api/appointments/", headers=headers, json=booking(client_id, service_id, i))
+        for i, client_id in enumerate(client_ids)
+    ))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [409] * (RACERS - 1)
+    assert appointment_count() == 1
+
+
+async def test_parallel_batches_one_wins(api, racers):
+    headers, service_id, client_ids = racers
+    responses = await asyncio.gather(*(
+        api.post("/api/appointments/batch", headers=headers, json={"operations": [
+            {"op": "create", "data": booking(client_id, service_id, i)},
+        ]})
+        for i, client_id in enumerate(client_ids)
+    ))
+    assert all(response.status_code == 200 for response in responses)
+    statuses = sorted(response.json()[0]["status"] for response in responses)
+    assert statuses == [201] + [409] * (RACERS - 1)
+    assert appointment_count() == 1
+
+
+async def test_overlap_inside_one_batch(api, racers):
+    headers, service_id, client_ids = racers
+    response = await api.post("/api/appointments/batch", headers=headers, json={"operations": [
+        {"op": "create", "data": booking(client_id, service_id, i)} for i, client_id in enumerate(client_ids)
+    ]})
+    statuses = [result["status"] for result in response.json()]
+    assert statuses == [201] + [409] * (RACERS - 1)
+    assert appointment_count() == 1
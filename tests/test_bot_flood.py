@@ -0,0 +1,94 @@
+"""Поток обновлений бота: API отвечает, отправка держится в лимитах Telegram"""
+import asyncio
+import time
+from collections import defaultdict
+
+import pytest
+from telegram import Update
+
+from app.core.database import SessionLocal, bot_engine
+from app.models import models
+from app.services.telegram_bot import telegram_bot
+from app.services.telegram_sender import TelegramSendQueue
+
+pytestmark = pytest.mark.anyio
+
+CHATS = 10
+UPDATES = 100
+GLOBAL_RATE = 50
+PER_CHAT_RATE, PER_CHAT_BURST = 10, 2
+
+
+def start_update(index: int) -> Update:
+    chat_id = 10_000 + index % CHATS
+    user = {"id": chat_id, "is_bot": False, "first_name": "Клиент", "username": f"flood_{chat_id}"}
+    return Update.de_json({
+        "update_id": index,
+        "message": {
+            "message_id": index,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }, None)
+
+
+@pytest.fixture
+async def flood_sender(fake_bot, monkeypatch):
+    sender = TelegramSendQueue(
+        global_rate=GLOBAL_RATE, per_chat_rate=PER_CHAT_RATE, per_chat_burst=PER_CHAT_BURST, workers=8
+    )
+    monkeypatch.setattr(telegram_bot, "sender", sender)
+    sender.start(fake_bot)
+    yield sender
+    await sender.stop()
+
+
+async def test_api_stays_responsive_during_bot_flood(api, owner, fake_bot, flood_sender):
+    user, headers = owner
+    with SessionLocal() as db:
+        db.add_all([
+            models.Client(
+                full_name=f"Клиент {chat_id}", phone=f"+7901{chat_id:07d}", owner_id=user.id,
+                telegram_username=f"flood_{chat_id}"
+            )
+            for chat_id in range(10_000, 10_000 + CHATS)
+        ])
+        db.commit()
+    await api.get("/api/clients/", headers=headers)  # пользователь попадает в кеш авторизации
+    # Первое подключение пула после dispose() в прошлом тесте идет под потоковым
+    # мьютексом SQLAlchemy: одновременные первые подключения бота заблокировали бы цикл
+    async with bot_engine.connect():
+        pass
+
+    started = time.monotonic()
+    flood = asyncio.gather(*(telegram_bot.start_command(start_update(i), None) for i in range(UPDATES)))
+    latencies = []
+    while not flood.done() and len(latencies) < 50:
+        request_started = time.monotonic()
+        response = await api.get("/api/clients/", headers=headers)
+        assert response.status_code == 200
+        latencies.append(time.monotonic() - request_started)
+    await flood
+    elapsed = time.monotonic() - started
+
+    # Ответы бота ждут лимитов в очереди отправки, запросы API — нет
+    replies = [(at, kwargs) for at, method, kwargs in fake_bot.calls if method == "send_message"]
+    assert len(replies) == UPDATES
+    assert all(kwargs["text"].startswith("Привет") for _, kwargs in replies)
+    assert elapsed > 0.5
+    assert latencies and max(latencies) < elapsed / 4
+
+    # Общий лимит: не больше GLOBAL_RATE в секунду сверх начального запаса
+    times = [at for at, _ in replies]
+    assert len(times) <= GLOBAL_RATE * (times[-1] - times[0]) + GLOBAL_RATE + 1
+
+    # Лимит чата: после PER_CHAT_BURST сообщений — не чаще PER_CHAT_RATE в секунду
+    by_chat = defaultdict(list)
+    for at, kwargs in replies:
+        by_chat[kwargs["chat_id"]].append(at)
+    for chat_times in by_chat.values():
+        span = chat_times[-1] - chat_times[0]
+        assert span >= (len(chat_times) - PER_CHAT_BURST) / PER_CHAT_RATE * 0.9
@@ -0,0 +1,106 @@
+"""Кеш клиентов бота: клиент удален в другом процессе, а кеш еще помнит его"""
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import text
+from telegram import Update
+
+from app.core.bot_cache import client_identity_cache
+from app.core.database import SessionLocal
+from app.models import models
+from app.services.telegram_bot import telegram_bot
+from app.services.telegram_sender import TelegramSendQueue
+
+pytestmark = pytest.mark.anyio
+
+TELEGRAM_ID = 777
+
+
+def button(data: str) -> Update:
+    return Update.de_json({
+        "update_id": 1,
+        "callback_query": {
+            "id": "query",
+            "from": {"id": TELEGRAM_ID, "is_bot": False, "first_name": "Клиент"},
+            "chat_instance": "chat",
+            "data": data,
+            "message": {"message_id": 5, "date": 0, "chat": {"id": TELEGRAM_ID, "type": "private"}},
+        },
+    }, None)
+
+
+def last_edit(fake_bot) -> str:
+    return [kwargs["text"] for _, method, kwargs in fake_bot.calls if method == "edit_message_text"][-1]
+
+
+def add_client(owner_id: int, phone: str) -> int:
+    with SessionLocal() as db:
+        client = models.Client(full_name="Клиент", phone=phone, owner_id=owner_id, telegram_id=str(TELEGRAM_ID))
+        db.add(client)
+        db.commit()
+        return client.id
+
+
+def delete_client_elsewhere(client_id: int):
+    """Удаление мимо crud: кеш этого процесса о нем не знает, как после удаления через API"""
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM clients WHERE id = :id"), {"id": client_id})
+        db.commit()
+
+
+def next_weekday_slot() -> datetime:
+    day = datetime.now().date() + timedelta(days=1)
+    while day.weekday() > 4:
+        day += timedelta(days=1)
+    return datetime.combine(day, time(10, 0))
+
+
+@pytest.fixture
+async def bot_sender(fake_bot, monkeypatch):
+    sender = TelegramSendQueue(global_rate=1000, per_chat_rate=1000, per_chat_burst=1000, workers=2)
+    monkeypatch.setattr(telegram_bot, "sender", sender)
+    sender.start(fake_bot)
+    yield sender
+    await sender.stop()
+
+
+@pytest.fixture
+def cached_client(owner, fake_bot, bot_sender):
+    user, _ = owner
+    with SessionLocal() as db:
+        service = models.Service(name="Стрижка", duration_minutes=60, is_active=True)
+        db.add(service)
+        db.commit()
+        service_id = service.id
+    return user.id, service_id, add_client(user.id, "+79000000001")
+
+
+async def test_deleted_client_is_not_served_from_cache(api, fake_bot, cached_client):
+    owner_id, service_id, client_id = cached_client
+    await telegram_bot.button_callback(button("contact_info"), None)
+    assert client_identity_cache.get(("id", str(TELEGRAM_ID))).id == client_id
+
+    delete_client_elsewhere(client_id)
+    for data in ["my_appointments", "cancel_appointment_1", f"book_slot_{service_id}_"
+                 + next_weekday_slot().strftime("%Y%m%d%H%M")]:
+        await telegram_bot.button_callback(button(data), None)
+        assert last_edit(fake_bot) == "Вы не зарегистрированы в системе.", data
+
+    assert client_identity_cache.get(("id", str(TELEGRAM_ID))) is None
+    with SessionLocal() as db:
+        assert db.query(models.Appointment).count() == 0
+
+
+async def test_booking_re_resolves_recreated_client(api, fake_bot, cached_client):
+    owner_id, service_id, client_id = cached_client
+    await telegram_bot.button_callback(button("contact_info"), None)
+
+    delete_client_elsewhere(client_id)
+    new_client_id = add_client(owner_id, "+79000000002")
+    slot = next_weekday_slot()
+    await telegram_bot.button_callback(button(f"book_slot_{service_id}_{slot.strftime('%Y%m%d%H%M')}"), None)
+
+    assert last_edit(fake_bot).startswith("✅ Вы успешно записаны!")
+    with SessionLocal() as db:
+        (appointment,) = db.query(models.Appointment).all()
+        assert (appointment.client_id, appointment.datetime) == (new_client_id, slot)
@@ -0,0 +1,86 @@
+"""Импорт клиентов: нормализация телефонов и дубликаты среди записанных номеров"""
+import io
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import literal_column, select
+
+from app.core.database import SessionLocal
+from app.models import models
+from app.services.client_import import ClientImport, import_clients, normalize_phone, read_rows
+
+PHONES = [
+    ("+7 900 123-45-67", "+79001234567"),
+    ("8 (900) 123-45-67", "+79001234567"),
+    ("9001234567", "+79001234567"),
+    ("495 123-45-67", "+74951234567"),
+    ("8 495 123 45 67", "+74951234567"),
+    ("74951234567", "+74951234567"),
+    ("+44 20 7946 0958", "+442079460958"),
+    ("+4951234567", "+4951234567"),
+    ("12345", None),
+    (None, None),
+]
+
+
+@pytest.mark.parametrize("raw, phone", PHONES)
+def test_normalize_phone(raw, phone):
+    assert normalize_phone(raw) == phone
+
+
+def test_xlsx_rows_are_read_and_normalized():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["ФИО", "Телефон", "Почта"])
+    sheet.append(["Иван Петров", 89001234567, "ivan@example.com"])  # Excel хранит номер числом
+    sheet.append([None, None, None])
+    sheet.append(["Без телефона", None, None])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+
+    rows = list(read_rows(file, "Клиенты.XLSX"))
+    assert [line for line, _ in rows] == [2, 4]
+    state = ClientImport(owner_id=1)
+    prepared = state.prepare(rows)
+    assert [client["phone"] for _, client in prepared] == ["+79001234567"]
+    assert prepared[0][1]["email"] == "ivan@example.com"
+    assert [(error.row, error.error) for error in state.errors] == [(4, "Некорректный телефон")]
+
+
+def test_stored_phones_are_normalized_like_import(database):
+    """SQL-выражение models.CLIENT_PHONE_KEY приводит номера так же, как normalize_phone"""
+    stored = [raw for raw, phone in PHONES if phone]
+    with SessionLocal() as db:
+        owner = models.User(email="owner@example.com", password_hash="-", full_name="Владелец")
+        db.add(owner)
+        db.flush()
+        for i, raw in enumerate(stored):
+            db.add(models.Client(full_name=f"Клиент {i}", phone=raw, owner_id=owner.id))
+        db.commit()
+        keys = dict(db.execute(
+            select(models.Client.phone, literal_column(models.CLIENT_PHONE_KEY))
+        ).all())
+    assert keys == {raw: normalize_phone(raw) for raw in stored}
+
+
+def test_import_skips_phones_stored_in_other_format(owner):
+    user, _ = owner
+    with SessionLocal() as db:
+        other = models.User(email="other@example.com", password_hash="-", full_name="Другой")
+        db.add(other)
+        db.flush()
+        db.add_all([
+            models.Client(full_name="Уже есть", phone="8 (900) 123-45-67", owner_id=user.id),
+            models.Client(full_name="Чужой", phone="495 123-45-67", owner_id=other.id),
+        ])
+        db.commit()
+
+    csv = "ФИО;Телефон\nПовтор;+7 900 123 45 67\nЗанят;8 495 123 45 67\nНовый;9007654321\n"
+    with SessionLocal() as db:
+        report = import_clients(db, read_rows(io.BytesIO(csv.encode()), "clients.csv"), user.id)
+        phones = set(db.scalars(select(models.Client.phone)))
+
+    assert (report.created, report.duplicates, report.failed) == (1, 1, 1)
+    assert report.errors[0].error == "Телефон уже используется"
+    assert phones == {"8 (900) 123-45-67", "495 123-45-67", "+79007654321"}
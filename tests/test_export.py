@@ -0,0 +1,55 @@
+"""Выгрузки: лимит одновременных выгрузок держится с проверки до конца ответа"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api import export
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import models
+
+pytestmark = pytest.mark.anyio
+
+
+def response():
+    return export._export_response(select(*export.CLIENT_COLUMNS), ["id"], "clients", "csv", False)
+
+
+@pytest.fixture
+def one_export(monkeypatch):
+    monkeypatch.setattr(settings, "export_max_concurrent", 1)
+    assert export._running_exports == 0
+
+
+async def test_slot_is_taken_before_streaming(one_export):
+    first = response()
+    # Поток первой выгрузки еще не начался, а вторая уже не проходит
+    with pytest.raises(HTTPException) as error:
+        response()
+    assert error.value.status_code == 503
+
+    # Клиент ушел до начала потока: место освобождает фоновая задача ответа
+    await first.background()
+    assert export._running_exports == 0
+    await first.background()
+    assert export._running_exports == 0
+
+
+async def test_slot_is_released_once_after_stream(api, owner, one_export):
+    user, headers = owner
+    with SessionLocal() as db:
+        db.add(models.Client(full_name="Клиент", phone="+79000000001", owner_id=user.id))
+        db.commit()
+
+    responses = await asyncio.gather(*(api.get("/api/export/clients", headers=headers) for _ in range(3)))
+    statuses = [response.status_code for response in responses]
+    assert 200 in statuses and set(statuses) <= {200, 503}, statuses
+    assert export._running_exports == 0
+
+    # Место освобождено один раз: следующая выгрузка проходит, счетчик не ушел ниже нуля
+    response = await api.get("/api/export/clients", headers=headers)
+    assert response.status_code == 200
+    assert "+79000000001" in response.text
+    assert export._running_exports == 0
@@ -0,0 +1,31 @@
+"""Метрики процесса доступны только администраторам"""
+import pytest
+
+from app.core.auth import get_current_user
+from app.main import app
+from app.schemas import schemas
+
+pytestmark = pytest.mark.anyio
+
+METRICS = ["/api/metrics/db-pool", "/api/metrics/caches", "/api/metrics/telegram"]
+
+
+def user(is_admin: bool) -> schemas.User:
+    return schemas.User(
+        id=1, email="user@example.com", full_name="Пользователь",
+        is_active=True, is_admin=is_admin, created_at="2026-01-01T00:00:00"
+    )
+
+
+async def test_metrics_require_authentication(api):
+    for url in METRICS:
+        response = await api.get(url)
+        assert response.status_code == 403, url
+
+
+@pytest.mark.parametrize("is_admin, status", [(False, 403), (True, 200)])
+async def test_metrics_require_admin(api, is_admin, status):
+    app.dependency_overrides[get_current_user] = lambda: user(is_admin)
+    for url in METRICS:
+        response = await api.get(url)
+        assert response.status_code == status, url
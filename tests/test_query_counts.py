@@ -0,0 +1,79 @@
+"""Число SQL-выражений эндпоинтов чтения не растет с числом строк (нет N+1)"""
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, async_engine
+from app.models import models
+
+pytestmark = pytest.mark.anyio
+
+SMALL, LARGE = 2, 20
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def add_appointments(owner_id: int, start: int, stop: int, day: datetime):
+    """Клиенты start..stop-1, у каждого своя услуга и запись на day без пересечений"""
+    with SessionLocal() as db:
+        for i in range(start, stop):
+            client = models.Client(full_name=f"Клиент {i}", phone=f"+7900{i:07d}", owner_id=owner_id)
+            service = models.Service(name=f"Услуга {i}", duration_minutes=20)
+            begin = day + timedelta(minutes=30 * i)
+            db.add(models.Appointment(
+                datetime=begin, end_datetime=begin + timedelta(minutes=20),
+                client=client, service=service, owner_id=owner_id
+            ))
+        db.commit()
+        return db.query(models.Appointment.id).order_by(models.Appointment.id).first()[0]
+
+
+async def statement_counts(api, headers, day: datetime, limit: int, appointment_id: int) -> dict:
+    requests = {
+        "clients": f"/api/clients/?limit={limit}",
+        "appointments": f"/api/appointments/?limit={limit}",
+        "by-date": f"/api/appointments/by-date/{day.date().isoformat()}",
+        "upcoming": "/api/appointments/upcoming?days_ahead=7",
+        "detail": f"/api/appointments/{appointment_id}",
+    }
+    counts = {}
+    for name, url in requests.items():
+        with count_statements() as statements:
+            response = await api.get(url, headers=headers)
+        assert response.status_code == 200, (name, response.text)
+        rows = response.json()
+        if isinstance(rows, list) and name != "clients":
+            # Вложенные клиент и услуга заполнены у каждой строки
+            assert all(row["client"] and row["service"] for row in rows)
+        counts[name] = len(statements)
+    return counts
+
+
+async def test_read_endpoints_run_fixed_number_of_statements(api, owner):
+    user, headers = owner
+    day = datetime.combine(datetime.now().date() + timedelta(days=1), time(0, 0))
+
+    appointment_id = add_appointments(user.id, 0, SMALL, day)
+    await api.get("/api/clients/", headers=headers)  # пользователь попадает в кеш авторизации
+    small = await statement_counts(api, headers, day, SMALL, appointment_id)
+
+    add_appointments(user.id, SMALL, LARGE, day)
+    large = await statement_counts(api, headers, day, LARGE, appointment_id)
+
+    assert large == small
+    # Один запрос на страницу: клиенты и услуги загружаются в нем же
+    assert all(count == 1 for count in small.values()), small
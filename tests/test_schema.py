@@ -0,0 +1,29 @@
+"""Веб-процесс и воркер не запускаются на схеме без последней миграции"""
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from app.core.database import async_engine
+from app.core.schema import alembic_config, check_schema_revision
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_schema_revision_is_checked(database):
+    script = ScriptDirectory.from_config(alembic_config())
+    head = script.get_current_head()
+    previous = script.get_revision(head).down_revision
+    # Фикстура создает таблицы через create_all, без ревизии Alembic
+    with pytest.raises(RuntimeError, match="без миграций"):
+        await check_schema_revision()
+
+    with database.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num varchar(32) PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": previous})
+    with pytest.raises(RuntimeError, match=f"ревизии {previous}"):
+        await check_schema_revision()
+
+    with database.begin() as conn:
+        conn.execute(text("UPDATE alembic_version SET version_num = :revision"), {"revision": head})
+    await check_schema_revision()
+    await async_engine.dispose()
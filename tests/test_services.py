@@ -0,0 +1,42 @@
+"""Каталог услуг: услуга без длительности не ломает каталог"""
+import pytest
+
+from app.core.auth import get_current_user
+from app.core.database import SessionLocal
+from app.main import app
+from app.models import models
+from app.schemas import schemas
+
+pytestmark = pytest.mark.anyio
+
+
+def admin() -> schemas.User:
+    return schemas.User(
+        id=1, email="admin@example.com", full_name="Администратор",
+        is_active=True, is_admin=True, created_at="2026-01-01T00:00:00"
+    )
+
+
+async def test_update_rejects_null_duration(api):
+    app.dependency_overrides[get_current_user] = admin
+    response = await api.put("/api/services/1", json={"duration_minutes": None})
+    assert response.status_code == 422
+
+
+async def test_catalog_keeps_service_without_duration(api, database):
+    with SessionLocal() as db:
+        timed = models.Service(name="Стрижка", duration_minutes=45)
+        untimed = models.Service(name="Консультация")
+        db.add_all([timed, untimed])
+        db.flush()
+        untimed.duration_minutes = None  # Так услуга могла сохраниться до проверки в ServiceUpdate
+        db.commit()
+        untimed_id = untimed.id
+
+    response = await api.get("/api/services/")
+    assert response.status_code == 200
+    assert {service["name"]: service["duration_minutes"] for service in response.json()} == {
+        "Стрижка": 45, "Консультация": None
+    }
+    response = await api.get(f"/api/services/{untimed_id}")
+    assert response.status_code == 200
@@ -0,0 +1,119 @@
+"""Очередь отправки Telegram с фейковым ботом: повторы, ошибки, ответы на кнопки"""
+import pytest
+from telegram import CallbackQuery, Chat, Message, User
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from app.services.telegram_bot import TelegramBot
+from app.services.telegram_sender import TelegramSendQueue
+
+pytestmark = pytest.mark.anyio
+
+
+def send_queue(**options) -> TelegramSendQueue:
+    """Очередь без заметных лимитов и с короткими задержками повторов"""
+    defaults = dict(
+        global_rate=1000, per_chat_rate=1000, per_chat_burst=1000, workers=2,
+        max_retries=3, backoff_base=0.01, backoff_max=0.05,
+    )
+    return TelegramSendQueue(**{**defaults, **options})
+
+
+async def test_retry_after_waits_and_retries(fake_bot):
+    fake_bot.fail("send_message", RetryAfter(0.2))
+    queue = send_queue()
+    queue.start(fake_bot)
+    try:
+        result = await queue.send_message(1, "привет")
+    finally:
+        await queue.stop()
+
+    assert result["text"] == "привет"
+    (first, *_), (second, *_) = fake_bot.calls
+    assert second - first >= 0.2
+    assert queue.stats() == {"queued": 0, "sent": 1, "retried": 1, "failed": 0, "dead_letters": 0}
+
+
+async def test_bad_request_is_not_retried(fake_bot):
+    fake_bot.fail("send_message", BadRequest("Chat not found"))
+    queue = send_queue()
+    queue.start(fake_bot)
+    try:
+        with pytest.raises(BadRequest):
+            await queue.send_message(1, "привет")
+    finally:
+        await queue.stop()
+
+    assert len(fake_bot.calls) == 1
+    (dead_letter,) = queue.dead_letters
+    assert (dead_letter.chat_id, dead_letter.method, dead_letter.attempts) == (1, "send_message", 1)
+    assert queue.stats()["retried"] == 0
+
+
+async def test_network_error_is_retried_with_backoff(fake_bot):
+    fake_bot.fail("send_message", NetworkError("timeout"), NetworkError("timeout"))
+    queue = send_queue()
+    queue.start(fake_bot)
+    try:
+        await queue.send_message(1, "привет")
+    finally:
+        await queue.stop()
+
+    assert len(fake_bot.calls) == 3
+    assert queue.stats()["retried"] == 2
+    assert not queue.dead_letters
+
+
+async def test_network_error_goes_to_dead_letters_after_max_retries(fake_bot):
+    fake_bot.fail("send_message", *[NetworkError("timeout")] * 4)
+    queue = send_queue(max_retries=3)
+    queue.start(fake_bot)
+    try:
+        with pytest.raises(NetworkError):
+            await queue.send_message(1, "привет")
+    finally:
+        await queue.stop()
+
+    assert len(fake_bot.calls) == 4
+    (dead_letter,) = queue.dead_letters
+    assert dead_letter.attempts == 4
+
+
+async def test_callback_answer_goes_through_queue_without_chat_id(fake_bot):
+    queue = send_queue()
+    queue.start(fake_bot)
+    try:
+        await queue.answer_callback_query(1, "query-1")
+    finally:
+        await queue.stop()
+
+    ((_, method, kwargs),) = fake_bot.calls
+    assert (method, kwargs) == ("answer_callback_query", {"callback_query_id": "query-1"})
+    assert queue.stats()["sent"] == 1
+
+
+async def test_callback_answer_skips_chat_limit(fake_bot):
+    queue = send_queue(per_chat_rate=0.1, per_chat_burst=1)
+    queue.start(fake_bot)
+    try:
+        await queue.send_message(1, "привет")
+        # Лимит чата исчерпан на 10 с, ответ на кнопку его не ждет
+        await queue.answer_callback_query(1, "query-1")
+    finally:
+        await queue.stop(timeout=0.1)
+
+    assert [method for _, method, _ in fake_bot.calls] == ["send_message", "answer_callback_query"]
+
+
+async def test_bot_answers_callback_through_queue(fake_bot):
+    bot = TelegramBot()
+    bot.sender = send_queue()
+    bot.sender.start(fake_bot)
+    user = User(id=7, first_name="Клиент", is_bot=False)
+    message = Message(message_id=3, date=None, chat=Chat(id=7, type="private"))
+    try:
+        await bot.answer(CallbackQuery(id="query-7", from_user=user, chat_instance="7", message=message))
+    finally:
+        await bot.sender.stop()
+
+    ((_, method, kwargs),) = fake_bot.calls
+    assert (method, kwargs) == ("answer_callback_query", {"callback_query_id": "query-7"})
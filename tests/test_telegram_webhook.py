@@ -0,0 +1,34 @@
+"""Режим webhook требует секрет: без него Telegram получал бы 403 на каждое обновление"""
+import pytest
+
+from app.core.config import settings
+from app.services import background
+from app.services.telegram_bot import telegram_bot
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def webhook_settings(monkeypatch):
+    monkeypatch.setattr(settings, "telegram_bot_token", "123:token")
+    monkeypatch.setattr(settings, "telegram_webhook_url", "https://example.com/api/telegram/webhook")
+    monkeypatch.setattr(settings, "telegram_webhook_secret", None)
+
+
+async def test_webhook_receiver_refuses_to_start_without_secret(webhook_settings):
+    with pytest.raises(RuntimeError, match="TELEGRAM_WEBHOOK_SECRET"):
+        await background.start_webhook_receiver()
+    assert not telegram_bot.webhook_running
+
+
+async def test_background_services_refuse_webhook_without_secret(webhook_settings):
+    with pytest.raises(RuntimeError, match="TELEGRAM_WEBHOOK_SECRET"):
+        await background.start_background_services(serve_webhook=True)
+
+
+async def test_webhook_rejects_wrong_secret(api, monkeypatch):
+    monkeypatch.setattr(settings, "telegram_webhook_secret", "secret")
+    response = await api.post(
+        "/api/telegram/webhook", json={}, headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+    )
+    assert response.status_code == 403